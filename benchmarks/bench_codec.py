@@ -0,0 +1,72 @@
+"""
+benchmarks/bench_codec.py
+Eventos/s en un núcleo del camino decodificar -> normalizar -> serializar de cada
+mensaje del stream: la implementación anterior (json.loads, datetime.now().isoformat()
+por evento y json.dumps) frente a src/streaming/codec.py con cada backend disponible.
+
+Uso:
+  python benchmarks/bench_codec.py --events 200000
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from fake_ws import combined_trade_messages  # noqa: E402
+from streaming.codec import AVAILABLE, get_codec, ms_to_iso  # noqa: E402
+
+def legacy(messages):
+    out = []
+    for msg in messages:
+        d = json.loads(msg)["data"]
+        rec = {
+            "ts": datetime.now(timezone.utc).isoformat(), "source": "binance", "instrument": d["s"],
+            "price": float(d["p"]), "currency": "USDT", "qty": float(d["q"]), "trade_id": d["t"],
+        }
+        out.append(json.dumps(rec, ensure_ascii=False).encode("utf-8") + b"\n")
+    return out
+
+def with_codec(codec):
+    def run(messages):
+        out = []
+        for msg in messages:
+            envelope = codec.loads(msg)
+            d = envelope["data"]
+            rec = {
+                "ts": ms_to_iso(d["T"]), "source": "binance", "instrument": d["s"],
+                "price": float(d["p"]), "currency": "USDT", "qty": float(d["q"]), "trade_id": d["t"],
+            }
+            out.append(codec.dump_line(rec))
+        return out
+    return run
+
+def bench(fn, messages, repeat=3):
+    best = min(_timed(fn, messages) for _ in range(repeat))
+    return len(messages) / best
+
+def _timed(fn, messages):
+    start = time.perf_counter()
+    fn(messages)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark del codec del stream")
+    parser.add_argument("--events", type=int, default=100000, help="Número de mensajes")
+    args = parser.parse_args()
+
+    messages = combined_trade_messages(args.events)
+    results = {"anterior (json + now)": bench(legacy, messages)}
+    for name, available in AVAILABLE.items():
+        if available:
+            results[f"codec {name}"] = bench(with_codec(get_codec(name)), messages)
+    base = results["anterior (json + now)"]
+    for name, rate in results.items():
+        print(f"{name:<22} {rate:>12,.0f} eventos/s  x{rate / base:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+benchmarks/bench_dedup.py
+Deduplicación por clave sobre datos sintéticos con la forma de Online Retail II:
+la función del notebook act4 (doble sort_values + drop_duplicates) frente a
+src/data/cleaning.py en memoria y fuera de memoria (particiones por hash).
+También comprueba que el resultado coincide con la referencia (sort estable).
+
+Uso:
+  python benchmarks/bench_dedup.py --rows 1000000
+  python benchmarks/bench_dedup.py --rows 10000000 --skip-legacy
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.data.cleaning import (RETAIL_KEYS, dedup_by_key, dedup_by_key_out_of_core,  # noqa: E402
+                               iter_parquet, retail_preference)
+
+def synthetic_retail(n, seed=0):
+    """Filas con ~30% de claves repetidas, precios a cero y empates de fecha."""
+    rng = np.random.default_rng(seed)
+    base = n * 7 // 10
+    src = rng.integers(0, base, n)
+    invoices = 489434 + src // 8
+    dates = pd.Timestamp("2009-12-01") + pd.to_timedelta(src * 37 % 60_000_000, unit="s")
+    return pd.DataFrame({
+        "Invoice": pd.Categorical(invoices.astype(str)),
+        "StockCode": pd.Categorical((10000 + src % 4000).astype(str)),
+        "Description": pd.Categorical(np.char.add("PRODUCT ", (src % 4000).astype(str))),
+        "Quantity": rng.integers(-20, 100, n).astype("int32"),
+        "InvoiceDate": dates,
+        "Price": rng.choice(np.array([0.0, 0.85, 1.25, 2.95], dtype="float32"), n),
+        "Customer ID": pd.array(np.where(src % 5 == 0, None, 12346 + src % 5942), dtype="Int32"),
+        "Country": pd.Categorical(rng.choice(["United Kingdom", "France", "Germany", "EIRE"], n)),
+        "row": np.arange(n),
+    }).assign(InvoiceDate=lambda d: d["InvoiceDate"] + pd.to_timedelta(rng.integers(0, 2, n), unit="D"))
+
+def legacy_dedup(df_, key_cols):
+    """Copia de dedup_by_key de notebooks/act4.py (con Price en lugar de UnitPrice)."""
+    df_sorted = df_.sort_values('InvoiceDate')
+    df_sorted['_price_nonzero'] = (df_sorted['Price'] != 0).astype(int)
+    df_sorted = df_sorted.sort_values(['_price_nonzero'], ascending=False)
+    return df_sorted.drop_duplicates(subset=key_cols, keep='first').drop(columns=['_price_nonzero'])
+
+def reference_dedup(df, key_cols):
+    ranked = df.assign(_nz=df["Price"] != 0).sort_values(["_nz", "InvoiceDate"], ascending=False, kind="stable")
+    return ranked.drop_duplicates(subset=key_cols, keep="first").drop(columns="_nz")
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de deduplicación por clave")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Filas sintéticas")
+    parser.add_argument("--partitions", type=int, default=16, help="Particiones del modo fuera de memoria")
+    parser.add_argument("--skip-legacy", action="store_true", help="No ejecuta la versión del notebook ni la referencia")
+    args = parser.parse_args()
+
+    df = synthetic_retail(args.rows)
+    print(f"[INFO] {len(df):,} filas, {df.memory_usage(deep=True).sum() / 1024 ** 2:,.0f} MB")
+    expected = None
+    if not args.skip_legacy:
+        expected, t_ref = timed(lambda: set(reference_dedup(df, RETAIL_KEYS)["row"]))
+        legacy, t_legacy = timed(lambda: legacy_dedup(df, RETAIL_KEYS))
+        print(f"notebook (doble sort)     {t_legacy:8.2f}s  {len(legacy):,} filas  "
+              f"coincide con la referencia: {set(legacy['row']) == expected}")
+
+    new, t_new = timed(lambda: dedup_by_key(df, RETAIL_KEYS, retail_preference(df)))
+    check = "" if expected is None else f"  coincide con la referencia: {set(new['row']) == expected}"
+    print(f"dedup_by_key (argsort)    {t_new:8.2f}s  {len(new):,} filas{check}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "input.parquet"
+        df.to_parquet(src, index=False, row_group_size=250_000)
+        chunks = iter_parquet(src, batch_size=250_000)
+        (rows_in, rows_out), t_ooc = timed(lambda: dedup_by_key_out_of_core(
+            chunks, RETAIL_KEYS, Path(tmp) / "out", partitions=args.partitions))
+        same = set(pd.read_parquet(Path(tmp) / "out", columns=["row"])["row"]) == set(new["row"])
+        print(f"fuera de memoria ({args.partitions} part.) {t_ooc:8.2f}s  {rows_out:,} filas  "
+              f"coincide con dedup_by_key: {same}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+benchmarks/bench_extract.py
+Microbenchmark de la extracción de campos de artículos: ruta BeautifulSoup
+(original) frente a la ruta lxml con parada temprana (src/extract.py).
+
+Uso:
+  python benchmarks/bench_extract.py --repeat 200
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from extract import extract_fields, extract_fields_soup  # noqa: E402
+
+FIXTURES = ROOT_DIR / "benchmarks" / "fixtures" / "html"
+
+def time_per_doc(fn, payload, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(payload)
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de extracción BeautifulSoup vs lxml")
+    parser.add_argument("--repeat", type=int, default=100, help="Repeticiones por fixture")
+    args = parser.parse_args()
+
+    print(f"{'fixture':<28} {'KB':>6} {'bs4 ms':>8} {'lxml ms':>8} {'speedup':>8}")
+    for path in sorted(FIXTURES.glob("*.html")):
+        raw = path.read_bytes()
+        html = raw.decode("utf-8")
+        expected = extract_fields_soup(html)
+        got = extract_fields(raw, "utf-8")
+        if got != expected:
+            raise SystemExit(f"✗ {path.name}: resultados distintos\n  bs4:  {expected}\n  lxml: {got}")
+
+        slow = time_per_doc(extract_fields_soup, html, args.repeat)
+        fast = time_per_doc(lambda b: extract_fields(b, "utf-8"), raw, args.repeat)
+        print(f"{path.name:<28} {len(raw) / 1024:>6.1f} {slow * 1000:>8.2f} {fast * 1000:>8.2f} {slow / fast:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+benchmarks/bench_stream_sink.py
+Throughput de la escritura del stream de trades: un archivo abierto por mensaje
+(implementación anterior) frente a JsonlSink con buffer, y run_stream de punta a
+punta contra un servidor WebSocket local (benchmarks/fake_ws.py).
+
+Uso:
+  python benchmarks/bench_stream_sink.py --events 50000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "src"))
+sys.path.insert(0, str(ROOT_DIR / "src" / "streaming"))
+
+from data.sinks import JsonlSink  # noqa: E402
+from fake_ws import combined_trade_messages, serve_messages  # noqa: E402
+import stream_dual_ws  # noqa: E402
+
+def sample_records(n):
+    return [{
+        "ts": datetime.now(timezone.utc).isoformat(), "source": "binance", "instrument": "BTCUSDT",
+        "price": 60000.0 + i, "currency": "USDT", "qty": 0.01, "trade_id": i,
+    } for i in range(n)]
+
+def bench_open_per_record(records, out_dir):
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    for rec in records:
+        path = Path(out_dir) / f"stream_ws_{datetime.now().strftime('%Y-%m-%d')}.jsonl"
+        with path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    return len(records) / (time.perf_counter() - start)
+
+def bench_sink(records, out_dir, fsync):
+    start = time.perf_counter()
+    with JsonlSink(out_dir, "stream_ws", fsync=fsync) as sink:
+        for rec in records:
+            sink.write(rec)
+    return len(records) / (time.perf_counter() - start)
+
+async def bench_run_stream(n, out_dir, symbols=("BTCUSDT",)):
+    server, url = await serve_messages(combined_trade_messages(n // len(symbols), symbols))
+    try:
+        start = time.perf_counter()
+        await stream_dual_ws.run_stream(max_events=n, symbols=symbols, stream_types=["trade"],
+                                        base_url=url, out_dir=out_dir)
+        return n / (time.perf_counter() - start)
+    finally:
+        server.close()
+        await server.wait_closed()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escritura del stream de trades")
+    parser.add_argument("--events", type=int, default=20000, help="Número de eventos")
+    args = parser.parse_args()
+
+    records = sample_records(args.events)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "open_por_mensaje": bench_open_per_record(records, Path(tmp) / "legacy"),
+            "jsonl_sink": bench_sink(records, Path(tmp) / "sink", fsync=False),
+            "jsonl_sink_fsync": bench_sink(records, Path(tmp) / "sink_fsync", fsync=True),
+            "run_stream_ws_local": asyncio.run(bench_run_stream(args.events, Path(tmp) / "ws")),
+            "run_stream_4_simbolos": asyncio.run(bench_run_stream(
+                args.events, Path(tmp) / "ws4", ("BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT"))),
+        }
+    for name, rate in results.items():
+        print(f"{name:<24} {rate:>12,.0f} eventos/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+benchmarks/bench_suite.py
+Suite reproducible de rendimiento de los caminos de scraping y streaming, contra
+servidores locales que reproducen datos grabados:
+
+- scrape:     discover_links + parse_article (src/main.py) sobre benchmarks/fake_http.py
+- listing:    NewsScraper.parse_articles (src/scraper.py) sobre el listado grabado
+- run_stream: run_stream (src/streaming/stream_dual_ws.py) sobre benchmarks/fake_ws.py
+- poller:     PricePoller (src/streaming/poll_coincap_http.py) sobre benchmarks/fake_rest.py
+
+Cada caso corre en su propio proceso, así que el pico de RSS es el del caso. El
+resultado (throughput, p50/p99 en ms y pico de RSS) se guarda como JSON y se compara
+con la línea base guardada (benchmarks/baseline.json): un throughput menor o un p99
+mayor que la base más allá de `--tolerance` se marca como regresión.
+
+Uso:
+  python benchmarks/bench_suite.py
+  python benchmarks/bench_suite.py --cases run_stream poller --ws-rate 20000
+  python benchmarks/bench_suite.py --save-baseline
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+BENCH_DIR = ROOT_DIR / "benchmarks"
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_OUTPUT = ROOT_DIR / "reports" / "bench_suite.json"
+DEFAULT_TOLERANCE = 0.2
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def summarize(items, seconds, latencies, unit):
+    latencies = sorted(latencies)
+    return {
+        "items": items,
+        "unit": unit,
+        "seconds": round(seconds, 3),
+        "throughput": round(items / seconds, 1) if seconds else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+    }
+
+# --- Casos (se ejecutan en el proceso hijo) ----------------------------------
+
+def case_scrape(args):
+    import main as scraper
+    from fake_http import load_pages, serve_pages
+    from fetcher import Fetcher
+
+    server, base_url = serve_pages(*load_pages(), rate=args.http_rate, latency=args.http_latency)
+    fetcher = Fetcher(default_rate=args.fetch_rate, pool_maxsize=4)
+    try:
+        started = time.perf_counter()
+        links = scraper.discover_links(fetcher, base_url + "/world/", "127.0.0.1", limit=args.articles)
+        discover_s = time.perf_counter() - started
+        latencies = []
+        for url in links:
+            t0 = time.perf_counter()
+            scraper.parse_article(fetcher, url, "reuters")
+            latencies.append(time.perf_counter() - t0)
+        result = summarize(len(links), time.perf_counter() - started, latencies, "artículos/s")
+        result["discover_links_ms"] = round(discover_s * 1000, 3)
+        return result
+    finally:
+        fetcher.close()
+        server.shutdown()
+
+def case_listing(args):
+    from fake_http import load_pages, serve_pages
+    from scraper import NewsScraper
+
+    server, base_url = serve_pages(*load_pages())
+    try:
+        news = NewsScraper(base_url + "/world/", "Reuters")
+        html = news.fetch_content()
+        latencies, items = [], 0
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            items += len(news.parse_articles(html, max_articles=1000))
+            latencies.append(time.perf_counter() - t0)
+        return summarize(items, time.perf_counter() - started, latencies, "noticias/s")
+    finally:
+        server.shutdown()
+
+def case_run_stream(args):
+    from fake_ws import combined_trade_messages, serve_messages
+    import stream_dual_ws
+
+    # Latencia por mensaje: tiempo dentro de StreamRouter.route (normalizar, ordenar, escribir).
+    latencies = []
+    route = stream_dual_ws.StreamRouter.route
+
+    def timed_route(self, *a, **kw):
+        t0 = time.perf_counter()
+        try:
+            return route(self, *a, **kw)
+        finally:
+            latencies.append(time.perf_counter() - t0)
+    stream_dual_ws.StreamRouter.route = timed_route
+
+    symbols = args.symbols
+    n = args.events // len(symbols) * len(symbols)
+
+    async def run(out_dir):
+        server, url = await serve_messages(combined_trade_messages(n // len(symbols), symbols), rate=args.ws_rate)
+        try:
+            started = time.perf_counter()
+            await stream_dual_ws.run_stream(max_events=n, symbols=symbols, stream_types=["trade"],
+                                            base_url=url, out_dir=out_dir)
+            return time.perf_counter() - started
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seconds = asyncio.run(run(tmp))
+    return summarize(len(latencies), seconds, latencies, "eventos/s")
+
+def case_poller(args):
+    from fake_rest import rest_rows, serve_trades
+    from fake_ws import trade_messages
+    from poll_coincap_http import PricePoller
+
+    rows = rest_rows([m for s in args.symbols for m in trade_messages(10, s)])
+    server, base_url = serve_trades(rows)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            poller = PricePoller(args.symbols, args.poll_interval, base_url, tmp)
+            started = time.perf_counter()
+            stats = poller.run(args.poll_iterations)
+            seconds = time.perf_counter() - started
+        result = summarize(stats["ticks"] * len(args.symbols), seconds, poller.latencies, "precios/s")
+        result["skipped_ticks"] = stats["skipped_ticks"]
+        result["errors"] = stats["errors"]
+        return result
+    finally:
+        server.shutdown()
+
+CASES = {
+    "scrape": case_scrape,
+    "listing": case_listing,
+    "run_stream": case_run_stream,
+    "poller": case_poller,
+}
+
+def run_case(name, args):
+    """Proceso hijo: ejecuta un caso y escribe su resultado JSON en la última línea."""
+    for path in (ROOT_DIR / "src", ROOT_DIR / "src" / "streaming", BENCH_DIR):
+        sys.path.insert(0, str(path))
+    # La salida de los scrapers (progreso, avisos) no se mezcla con el JSON.
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = CASES[name](args)
+    # ru_maxrss está en KB en Linux (en bytes en macOS).
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result["peak_rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    print(json.dumps(result))
+
+# --- Proceso principal ----------------------------------------------------------
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline, tolerance):
+    """Lista de (caso, métrica, actual, base) que empeoran más de `tolerance`."""
+    regressions = []
+    for name, current in results["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            continue
+        if base.get("throughput") and current["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append((name, "throughput", current["throughput"], base["throughput"]))
+        if base.get("p99_ms") and current["p99_ms"] and current["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append((name, "p99_ms", current["p99_ms"], base["p99_ms"]))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks de scraping y streaming con datos grabados")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES), help="Casos a ejecutar")
+    parser.add_argument("--articles", type=int, default=100, help="Artículos a descargar en `scrape`")
+    parser.add_argument("--http-rate", type=float, default=None, help="Respuestas/s del servidor HTML (sin límite por defecto)")
+    parser.add_argument("--http-latency", type=float, default=0.0, help="Retardo fijo por respuesta HTML (s)")
+    parser.add_argument("--fetch-rate", type=float, default=1000.0, help="Límite del Fetcher (peticiones/s) en `scrape`")
+    parser.add_argument("--repeat", type=int, default=20, help="Repeticiones de parse_articles en `listing`")
+    parser.add_argument("--events", type=int, default=20000, help="Eventos de `run_stream`")
+    parser.add_argument("--ws-rate", type=float, default=None, help="Mensajes/s del servidor WS (sin límite por defecto)")
+    parser.add_argument("--symbols", nargs="+", default=["BTCUSDT", "ETHUSDT"], help="Símbolos de `run_stream` y `poller`")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="Intervalo del poller (s)")
+    parser.add_argument("--poll-iterations", type=int, default=100, help="Ticks del poller")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="JSON con los resultados")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="JSON de la línea base")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Margen antes de marcar regresión (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Guarda estos resultados como línea base")
+    parser.add_argument("--strict", action="store_true", help="Sale con código 1 si hay regresiones")
+    parser.add_argument("--case", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(args.case, args)
+        return
+
+    params = {k: v for k, v in vars(args).items()
+              if k not in ("cases", "output", "baseline", "tolerance", "save_baseline", "strict", "case")}
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": params,
+        "cases": {},
+    }
+    child_argv = [a for a in sys.argv[1:] if a not in ("--save-baseline", "--strict")]
+    for name in args.cases:
+        proc = subprocess.run([sys.executable, __file__, *child_argv, "--case", name],
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise SystemExit(f"✗ {name} falló:\n{proc.stderr}")
+        results["cases"][name] = json.loads(proc.stdout.strip().splitlines()[-1])
+        r = results["cases"][name]
+        print(f"✓ {name:<11} {r['throughput']:>12,.1f} {r['unit']:<12} p50={r['p50_ms']} ms  "
+              f"p99={r['p99_ms']} ms  RSS={r['peak_rss_mb']} MB")
+
+    out = Path(args.output)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"[DONE] Resultados en {out}")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"[DONE] Línea base guardada en {baseline_path}")
+        return
+    if not baseline_path.exists():
+        print(f"[WARN] Sin línea base en {baseline_path} (usa --save-baseline)")
+        return
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    if baseline.get("params") != params:
+        print("[WARN] La línea base se generó con otros parámetros; la comparación es orientativa")
+    regressions = compare(results, baseline, args.tolerance)
+    for name, metric, current, base in regressions:
+        print(f"✗ {name}.{metric}: {current} frente a {base} en la línea base ({baseline.get('commit')})")
+    if not regressions:
+        print(f"[STATS] Sin regresiones frente a {baseline.get('commit')} (tolerancia {args.tolerance:.0%})")
+    if regressions and args.strict:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+benchmarks/fake_http.py
+Servidor HTTP local que reproduce páginas HTML grabadas (benchmarks/fixtures/html),
+para medir los scrapers de src/ sin depender de los sitios reales (SOURCES, SOURCE_URL).
+
+- `/world/` (y `/`) devuelve el listado grabado.
+- Cualquier otra ruta devuelve uno de los artículos grabados, elegido de forma estable
+  por la ruta, así que cada enlace del listado resuelve siempre al mismo HTML.
+- `rate` limita las respuestas por segundo del servidor y `latency` añade un retardo
+  fijo por respuesta, para simular un sitio lento.
+"""
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "html"
+LISTING_PATHS = ("/", "/world/")
+
+def load_pages(listing="reuters_listing.html", articles=("reuters_article.html",)):
+    """(listado, [artículos]) en bytes desde benchmarks/fixtures/html."""
+    return (FIXTURES / listing).read_bytes(), [(FIXTURES / name).read_bytes() for name in articles]
+
+class _Pacer:
+    """Reparte las respuestas a `rate` por segundo entre todos los hilos del servidor."""
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0.0
+        self.next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+def serve_pages(listing, articles, host="127.0.0.1", port=0, rate=None, latency=0.0):
+    """
+    Arranca el servidor en un hilo. Devuelve (server, base_url); se detiene con
+    `server.shutdown()`. `server.requests` cuenta las peticiones atendidas.
+    """
+    pacer = _Pacer(rate)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive, como los sitios reales
+
+        def do_GET(self):
+            pacer.wait()
+            if latency:
+                time.sleep(latency)
+            path = self.path.split("?", 1)[0]
+            body = listing if path in LISTING_PATHS else articles[zlib.crc32(path.encode()) % len(articles)]
+            server.requests += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
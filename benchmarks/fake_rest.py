@@ -0,0 +1,60 @@
+"""
+benchmarks/fake_rest.py
+Servidor HTTP local que imita /api/v3/historicalTrades y /api/v3/ticker/price de
+Binance a partir de los mensajes de benchmarks/fake_ws.py, para probar el backfill y
+el poller de src/streaming sin depender de la red (BINANCE_REST_URL / rest_url).
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+def rest_rows(messages):
+    """Filas REST {símbolo: [fila, ...]} a partir de mensajes `trade` crudos del WS."""
+    rows = {}
+    for msg in messages:
+        d = json.loads(msg)
+        rows.setdefault(d["s"], []).append({
+            "id": d["t"], "price": d["p"], "qty": d["q"], "time": d["T"],
+            "isBuyerMaker": d["m"], "isBestMatch": d["M"],
+        })
+    return rows
+
+def serve_trades(rows, host="127.0.0.1", port=0):
+    """
+    Arranca el servidor en un hilo. `rows` es {símbolo: filas ordenadas por id}.
+    Devuelve (server, base_url); se detiene con `server.shutdown()`.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == "/api/v3/ticker/price":
+                # Último precio conocido de cada símbolo, individual o por lote (symbols=[...]).
+                symbols = json.loads(query["symbols"]) if "symbols" in query else [query.get("symbol")]
+                if any(s not in rows for s in symbols):
+                    self.send_error(400)
+                    return
+                tickers = [{"symbol": s, "price": rows[s][-1]["price"]} for s in symbols]
+                self._send_json(tickers if "symbols" in query else tickers[0])
+                return
+            if url.path != "/api/v3/historicalTrades" or query.get("symbol") not in rows:
+                self.send_error(404)
+                return
+            from_id, limit = int(query.get("fromId", 0)), int(query.get("limit", 500))
+            self._send_json([r for r in rows[query["symbol"]] if r["id"] >= from_id][:limit])
+
+        def _send_json(self, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
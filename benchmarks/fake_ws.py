@@ -0,0 +1,53 @@
+"""
+benchmarks/fake_ws.py
+Servidor WebSocket local que imita el stream de trades de Binance, para medir
+src/streaming sin depender de la red.
+"""
+import asyncio
+import json
+import random
+
+import websockets
+
+def trade_messages(n, symbol="BTCUSDT", start_id=1, seed=7):
+    """Mensajes `trade` sintéticos con el esquema del WS de Binance."""
+    rng = random.Random(seed)
+    price = 60000.0
+    event_ms = 1_700_000_000_000
+    messages = []
+    for i in range(n):
+        price += rng.uniform(-5, 5)
+        event_ms += rng.randint(0, 20)
+        messages.append(json.dumps({
+            "e": "trade", "E": event_ms, "s": symbol, "t": start_id + i,
+            "p": f"{price:.2f}", "q": f"{rng.uniform(0.0001, 0.5):.5f}",
+            "T": event_ms, "m": rng.random() < 0.5, "M": True,
+        }))
+    return messages
+
+def combined(messages, stream):
+    """Envuelve mensajes crudos con el formato del combined stream ({"stream", "data"})."""
+    return [f'{{"stream":"{stream}","data":{msg}}}' for msg in messages]
+
+def combined_trade_messages(n, symbols=("BTCUSDT",), seed=7):
+    """`n` trades por símbolo en formato combinado, intercalados como llegarían por una conexión."""
+    per_symbol = [combined(trade_messages(n, s, seed=seed + i), f"{s.lower()}@trade")
+                  for i, s in enumerate(symbols)]
+    return [msg for group in zip(*per_symbol) for msg in group]
+
+async def serve_messages(messages, host="127.0.0.1", port=0, rate=None):
+    """
+    Arranca un servidor que envía `messages` a cada cliente que se conecta (a `rate`
+    mensajes/s, o tan rápido como pueda si es None). Devuelve (server, url).
+    """
+    async def handler(ws):
+        delay = 1 / rate if rate else 0
+        for msg in messages:
+            await ws.send(msg)
+            if delay:
+                await asyncio.sleep(delay)
+        await ws.wait_closed()
+
+    server = await websockets.serve(handler, host, port)
+    bound_port = next(iter(server.sockets)).getsockname()[1]
+    return server, f"ws://{host}:{bound_port}"
@@ -16,9 +16,16 @@ import json
 pd.options.display.max_columns = 50
 pd.options.display.max_colwidth = 200
 
+import sys
 import pandas as pd
 from pathlib import Path  # ✅ Importamos Path para manejar rutas de archivos
 
+# 📦 Cargador con caché Parquet tipada (src/data/retail.py): la primera ejecución convierte
+# el Excel; las siguientes leen la caché en segundos. Buscamos la raíz del repo para importarlo.
+ROOT = next((p for p in [Path.cwd(), *Path.cwd().parents] if (p / 'src' / 'data').exists()), Path.cwd())
+sys.path.insert(0, str(ROOT))
+from src.data.retail import load_retail
+
 # 📁 Definimos la ruta del archivo Excel que contiene los datos
 file_path = 'online_retail_II.xlsx'
 
@@ -26,12 +33,9 @@ file_path = 'online_retail_II.xlsx'
 if not Path(file_path).exists():
     print(f'⚠️ No se encontró el archivo: {file_path}. Sube el archivo a Colab o cambia la ruta de acceso.')
 else:
-    # 📊 Leemos las hojas correspondientes a los años 2009-2010 y 2010-2011
-    df1 = pd.read_excel(file_path, sheet_name='Year 2009-2010')
-    df2 = pd.read_excel(file_path, sheet_name='Year 2010-2011')
-
-    # 🔗 Unimos ambos DataFrames en uno solo, ignorando los índices originales
-    df = pd.concat([df1, df2], ignore_index=True)
+    # 📊 Leemos las hojas 2009-2010 y 2010-2011 ya unidas y con tipos explícitos
+    # (categóricas, InvoiceDate datetime64, numéricos reducidos) e imprimimos la memoria antes/después
+    df = load_retail(file_path, cache_dir=ROOT / 'data' / 'interim')
 
     # ✅ Confirmamos la carga mostrando el número de filas y columnas
     print('✅ Dataset cargado correctamente.')
@@ -100,9 +104,10 @@ df['Quantity'] = pd.to_numeric(df['Quantity'], errors='coerce')
 
 # 🏷️ Definimos algunas columnas como categóricas (texto/etiquetas)
 # Esto ayuda a optimizar memoria y mejorar interpretabilidad en análisis
+# (StockCode, Description y Country ya llegan como categóricas desde load_retail)
 for col in ['InvoiceNo', 'StockCode', 'Description', 'Country', 'CustomerID']:
-    if col in df.columns:
-        df[col] = df[col].astype('object')
+    if col in df.columns and df[col].dtype != 'category':
+        df[col] = df[col].astype('category')
 
 # ✅ Mostramos los tipos de datos resultantes después de la conversión
 print('✅ Tipos después de la conversión:')
@@ -209,19 +214,14 @@ print('Filas que tienen duplicados exactos (count):', exact_dups)
 print('Filas duplicadas (drop duplicates keep=first):', df.duplicated().sum())
 
 # 3) Outliers — método IQR para Quantity y UnitPrice
-def detect_iqr_outliers(series):
-    q1 = series.quantile(0.25)
-    q3 = series.quantile(0.75)
-    iqr = q3 - q1
-    lower = q1 - 1.5*iqr
-    upper = q3 + 1.5*iqr
-    return (series < lower) | (series > upper), lower, upper
-
-for col in ['Quantity','UnitPrice']:
-    s = df[col].dropna()
-    out_mask, low, high = detect_iqr_outliers(s)
-    pct_out = out_mask.mean()*100
-    print(f'{col}: IQR lower={low}, upper={high}, % outliers (aprox)={pct_out:.4f}')
+# ⚡ src/data/cleaning.py calcula las vallas de todas las columnas con un solo quantile
+# (sin copias con dropna); para el histórico completo en Parquet existe FenceSketch/parquet_fences
+from src.data.cleaning import iqr_fences, outlier_mask
+
+fences = iqr_fences(df, ['Quantity','UnitPrice'])
+pct_out = outlier_mask(df, fences).sum() / df[list(fences)].notna().sum() * 100
+for col, fence in fences.items():
+    print(f"{col}: IQR lower={fence['lower']}, upper={fence['upper']}, % outliers (aprox)={pct_out[col]:.4f}")
 
 # Conteo antes de limpieza
 before = df.shape[0]
@@ -237,19 +237,17 @@ key_cols = ['InvoiceNo','StockCode','InvoiceDate','CustomerID']
 key_cols = [c for c in key_cols if c in df_no_exact_dup.columns]
 dup_by_key_before = df_no_exact_dup.duplicated(subset=key_cols).sum()
 # criterio: conservar la fila con UnitPrice != 0 y, si hay empate, la más reciente (mayor InvoiceDate)
+# ⚡ src/data/cleaning.py resuelve ambos criterios en una sola ordenación estable sobre las claves
+# categóricas (la doble sort_values anterior perdía el desempate por fecha)
+from src.data.cleaning import dedup_by_key as dedup_rows
+
 def dedup_by_key(df_):
-    # ordenar por InvoiceDate asc para que keep='last' conserve la más reciente
+    prefer = []
+    if 'UnitPrice' in df_.columns:
+        prefer.append((df_['UnitPrice'] != 0, False))
     if 'InvoiceDate' in df_.columns:
-        df_sorted = df_.sort_values('InvoiceDate')
-    else:
-        df_sorted = df_.copy()
-    # priorizar filas con UnitPrice != 0: crear helper key
-    if 'UnitPrice' in df_sorted.columns:
-        df_sorted['_price_nonzero'] = (df_sorted['UnitPrice'] != 0).astype(int)
-        # ordenar por price_nonzero then InvoiceDate
-        df_sorted = df_sorted.sort_values(['_price_nonzero'], ascending=False)
-    deduped = df_sorted.drop_duplicates(subset=key_cols, keep='first').drop(columns=[c for c in ['_price_nonzero'] if c in df_sorted.columns])
-    return deduped
+        prefer.append(('InvoiceDate', False))
+    return dedup_rows(df_, key_cols, prefer)
 
 df_dedup_key = dedup_by_key(df_no_exact_dup)
 dup_by_key_after = df_dedup_key.duplicated(subset=key_cols).sum()
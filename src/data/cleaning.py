@@ -0,0 +1,310 @@
+"""
+src/data/cleaning.py
+Limpieza reutilizable para tablas grandes (Online Retail II y similares).
+
+`dedup_by_key` conserva una fila por clave con una sola ordenación estable: las
+claves se reducen a un id de grupo entero (códigos de categóricas/factorize) que,
+junto con el rango de cada criterio de preferencia, forma un único entero; un solo
+`argsort` estable ordena por grupo y criterios a la vez, así que los empates
+se resuelven de forma determinista (por ejemplo, precio distinto de cero y, a
+igualdad, la fecha más reciente). Sustituye a la doble ordenación del notebook
+act4, cuya segunda `sort_values` no era estable y perdía el desempate por fecha.
+
+`dedup_by_key_out_of_core` hace lo mismo con datos que no caben en memoria: reparte
+las filas por hash de la clave en particiones Parquet (todas las filas de una clave
+caen en la misma) y deduplica cada partición por separado.
+
+`iqr_fences` calcula las vallas IQR exactas de varias columnas a la vez; `FenceSketch`
+las aproxima en una pasada por bloques con un sketch KLL por columna (memoria fija),
+y los sketches de cada archivo se combinan, así que `parquet_fences` reparte los
+archivos entre procesos.
+
+Uso (vallas del histórico completo):
+  python -m src.data.cleaning data/processed/retail --columns Quantity Price --workers 4
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RETAIL_KEYS = ["Invoice", "StockCode", "InvoiceDate", "Customer ID"]
+DEFAULT_PARTITIONS = 64
+
+def retail_preference(df, price="Price", date="InvoiceDate"):
+    """Criterio del notebook: primero precio distinto de cero, después la fecha más reciente."""
+    return [(df[price] != 0, False), (df[date], False)]
+
+def _codes(values):
+    """Códigos enteros de una columna y su número de valores distintos (nulo incluido)."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Los códigos de la categórica ya están: sólo se desplaza el -1 de los nulos.
+        return values.cat.codes.to_numpy(dtype="int64") + 1, len(values.cat.categories) + 1
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return codes.astype("int64"), len(uniques)
+
+def _rank(values, ascending):
+    """
+    Rango en el orden pedido, con los nulos siempre al final, y su cardinalidad. Las
+    fechas y enteros sin nulos se escalan por su paso común ((v - min) // paso) en
+    lugar de factorizarlos, que es mucho más caro; p. ej. fechas al segundo.
+    """
+    values = pd.Series(values)
+    if not values.hasnans and (pd.api.types.is_datetime64_any_dtype(values)
+                               or pd.api.types.is_integer_dtype(values)):
+        arr = pd.DatetimeIndex(values).asi8 if pd.api.types.is_datetime64_any_dtype(values) \
+            else values.to_numpy(dtype="int64")
+        lo = arr.min()
+        step = int(np.gcd.reduce(arr - lo)) or 1
+        span = int(arr.max() - lo) // step + 1
+        if span <= 2 ** 32:
+            ranks = (arr - lo) // step
+            return (ranks if ascending else span - 1 - ranks), span
+    codes, uniques = pd.factorize(values, sort=True)
+    n = len(uniques)
+    codes = codes.astype("int64")
+    ranks = codes if ascending else n - 1 - codes
+    ranks[codes < 0] = n
+    return ranks, n + 1
+
+def _combine(parts, length):
+    """Combina pares (códigos, cardinalidad) en un entero en base mixta; None si no cabe en int64."""
+    ids, size = np.zeros(length, dtype="int64"), 1
+    for codes, n in parts:
+        if size * n >= 2 ** 63:
+            return None
+        ids = ids * n + codes
+        size *= n
+    return ids
+
+def _group_codes(df, keys):
+    ids, size = np.zeros(len(df), dtype="int64"), 1
+    for key in keys:
+        codes, n = _codes(df[key])
+        if size * n >= 2 ** 63:
+            ids, uniques = pd.factorize(ids)
+            size = len(uniques)
+        ids = ids * n + codes
+        size *= n
+    return ids, size
+
+def group_ids(df, keys):
+    """
+    Id entero por combinación de claves (los nulos forman su propio grupo): los códigos
+    de cada clave se combinan en base mixta y sólo se compactan con factorize si el
+    producto de cardinalidades no cabe en int64.
+    """
+    return _group_codes(df, keys)[0]
+
+def dedup_by_key(df, keys, prefer=None, keep_order=True):
+    """
+    Devuelve `df` con una fila por combinación de `keys`.
+
+    `prefer` es una lista de (columna o Serie, ascendente) en orden de prioridad; se
+    conserva la fila que quedaría primera al ordenar por esos criterios (sin criterios,
+    la primera aparición, como `drop_duplicates(keep="first")`). Con `keep_order` el
+    resultado mantiene el orden original de las filas.
+    """
+    if df.empty:
+        return df.copy()
+    groups, size = _group_codes(df, keys)
+    ranks = [_rank(df[col] if isinstance(col, str) else col, asc) for col, asc in prefer or []]
+    # Grupo y criterios en un único entero: una sola ordenación estable, y la posición
+    # original desempata al final. Si no cabe, se compactan los grupos y, en último
+    # caso, se ordena con lexsort (también estable).
+    composite = _combine([(groups, size)] + ranks, len(df))
+    if composite is None:
+        groups, uniques = pd.factorize(groups)
+        composite = _combine([(groups, len(uniques))] + ranks, len(df))
+    if composite is not None:
+        order = np.argsort(composite, kind="stable")
+    else:
+        order = np.lexsort([r for r, _ in reversed(ranks)] + [groups])
+    sorted_groups = groups[order]
+    first = np.empty(len(order), dtype=bool)
+    first[0] = True
+    np.not_equal(sorted_groups[1:], sorted_groups[:-1], out=first[1:])
+    winners = order[first]
+    if keep_order:
+        winners.sort()
+    return df.iloc[winners]
+
+def _plain_dtype(series):
+    """Tipo de los valores de una categórica; enteros y booleanos con nulos pasan al tipo nullable."""
+    dtype = series.cat.categories.dtype
+    if dtype.kind in "iub" and series.hasnans:
+        # Int64/boolean hashean igual que int64/bool, así que el reparto por hash no cambia.
+        return "boolean" if dtype.kind == "b" else f"{'U' if dtype.kind == 'u' else ''}Int{dtype.itemsize * 8}"
+    return dtype
+
+def _plain(chunk):
+    """Categóricas a sus valores: cada bloque trae su propio diccionario."""
+    categorical = [c for c in chunk.columns if isinstance(chunk[c].dtype, pd.CategoricalDtype)]
+    return chunk.astype({c: _plain_dtype(chunk[c]) for c in categorical}) if categorical else chunk
+
+def iter_parquet(path, batch_size=1_000_000, columns=None):
+    """Bloques de DataFrame de un archivo o dataset Parquet, sin cargarlo entero."""
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(path, format="parquet")
+    for batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+        yield batch.to_pandas()
+
+def dedup_by_key_out_of_core(chunks, keys, out_dir, prefer=retail_preference,
+                             partitions=DEFAULT_PARTITIONS, tmp_dir=None):
+    """
+    Deduplica un iterable de bloques (p. ej. `iter_parquet(...)`) que no cabe en memoria.
+
+    Pasada 1: cada bloque se reparte por hash de `keys` en `partitions` archivos Parquet.
+    Pasada 2: cada partición se carga sola, se deduplica con `dedup_by_key` y se escribe
+    en `out_dir/part-NNNNN.parquet`. `prefer` recibe el DataFrame de la partición y
+    devuelve la lista de criterios. Devuelve (filas leídas, filas escritas).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    spill_dir = tempfile.mkdtemp(prefix="dedup-", dir=tmp_dir)
+    writers, schema, rows_in, categorical = {}, None, 0, set()
+    try:
+        for chunk in chunks:
+            rows_in += len(chunk)
+            categorical.update(c for c in chunk.columns if isinstance(chunk[c].dtype, pd.CategoricalDtype))
+            chunk = _plain(chunk)
+            part = (pd.util.hash_pandas_object(chunk[keys], index=False).to_numpy() % partitions).astype("int64")
+            order = np.argsort(part, kind="stable")
+            part_sorted = part[order]
+            bounds = np.flatnonzero(np.diff(part_sorted)) + 1
+            for idx in np.split(order, bounds):
+                if not len(idx):
+                    continue
+                table = pa.Table.from_pandas(chunk.iloc[idx], schema=schema, preserve_index=False)
+                schema = schema or table.schema
+                p = int(part[idx[0]])
+                if p not in writers:
+                    writers[p] = pq.ParquetWriter(os.path.join(spill_dir, f"{p:05d}.parquet"), schema)
+                writers[p].write_table(table)
+        for writer in writers.values():
+            writer.close()
+
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        rows_out = 0
+        for p in sorted(writers):
+            frame = pd.read_parquet(os.path.join(spill_dir, f"{p:05d}.parquet"))
+            frame = frame.astype({c: "category" for c in categorical if c in frame.columns})
+            deduped = dedup_by_key(frame, keys, prefer(frame) if callable(prefer) else prefer)
+            deduped.to_parquet(out / f"part-{p:05d}.parquet", index=False)
+            rows_out += len(deduped)
+        return rows_in, rows_out
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+# --- Outliers por IQR ---------------------------------------------------------
+
+IQR_FACTOR = 1.5
+DEFAULT_SKETCH_K = 400
+
+def _numeric(values):
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+def _fence(q1, q3, factor):
+    iqr = q3 - q1
+    return {"q1": float(q1), "q3": float(q3), "lower": float(q1 - factor * iqr), "upper": float(q3 + factor * iqr)}
+
+def iqr_fences(df, columns, factor=IQR_FACTOR):
+    """
+    Vallas IQR exactas de todas las columnas con un solo `quantile` vectorizado (los
+    nulos se ignoran sin copiar la columna). Para tablas que caben en memoria.
+    Devuelve {columna: {"q1", "q3", "lower", "upper"}}.
+    """
+    quartiles = df[list(columns)].apply(pd.to_numeric, errors="coerce").quantile([0.25, 0.75])
+    return {col: _fence(quartiles.at[0.25, col], quartiles.at[0.75, col], factor) for col in columns}
+
+class FenceSketch:
+    """
+    Vallas IQR aproximadas en una pasada por bloques: un KLLSketch por columna. Los
+    FenceSketch de distintas particiones se combinan con `merge`, así que cada proceso
+    puede resumir sus archivos y el total se obtiene al final sin cargar la tabla.
+    """
+    def __init__(self, columns, k=DEFAULT_SKETCH_K):
+        from .sketches import KLLSketch
+        self.columns = list(columns)
+        self.sketches = {col: KLLSketch(k) for col in self.columns}
+        self.rows = 0
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        for col in self.columns:
+            self.sketches[col].update(_numeric(chunk[col]))
+        return self
+
+    def merge(self, other):
+        for col in self.columns:
+            self.sketches[col].merge(other.sketches[col])
+        self.rows += other.rows
+        return self
+
+    def fences(self, factor=IQR_FACTOR):
+        fences = {}
+        for col, sketch in self.sketches.items():
+            q1, q3 = sketch.quantiles([0.25, 0.75])
+            fences[col] = _fence(q1, q3, factor)
+        return fences
+
+def sketch_parquet(path, columns, k=DEFAULT_SKETCH_K, batch_size=1_000_000):
+    """FenceSketch de un archivo o dataset Parquet, leyendo sólo `columns` por bloques."""
+    sketch = FenceSketch(columns, k)
+    for chunk in iter_parquet(path, batch_size=batch_size, columns=list(columns)):
+        sketch.update(chunk)
+    return sketch
+
+def parquet_fences(paths, columns, factor=IQR_FACTOR, k=DEFAULT_SKETCH_K, workers=None):
+    """Vallas IQR de varios archivos Parquet: un sketch por archivo en paralelo y merge al final."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    total = FenceSketch(columns, k)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for sketch in pool.map(sketch_parquet, paths, [columns] * len(paths), [k] * len(paths)):
+            total.merge(sketch)
+    return total.fences(factor), total.rows
+
+def outlier_mask(df, fences):
+    """DataFrame booleano: True donde el valor queda fuera de su valla (los nulos, False)."""
+    return pd.DataFrame({
+        col: (values < fence["lower"]) | (values > fence["upper"])
+        for col, fence in fences.items()
+        for values in [_numeric(df[col])]
+    }, index=df.index)
+
+def main():
+    parser = argparse.ArgumentParser(description="Vallas IQR de columnas numéricas de archivos o datasets Parquet")
+    parser.add_argument("inputs", nargs="+", help="Archivos Parquet o directorios de datasets")
+    parser.add_argument("--columns", nargs="+", required=True, help="Columnas numéricas, p. ej. Quantity Price")
+    parser.add_argument("--factor", type=float, default=IQR_FACTOR, help="Múltiplo del IQR")
+    parser.add_argument("--k", type=int, default=DEFAULT_SKETCH_K, help="Precisión del sketch KLL")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Procesos en paralelo")
+    parser.add_argument("--exact", action="store_true", help="Cuantiles exactos cargando las columnas en memoria")
+    parser.add_argument("--output", default=None, help="Guarda las vallas en este JSON")
+    args = parser.parse_args()
+
+    paths = sorted(str(f) for p in args.inputs
+                   for f in (Path(p).rglob("*.parquet") if Path(p).is_dir() else [Path(p)]))
+    started = time.perf_counter()
+    if args.exact:
+        df = pd.concat([pd.read_parquet(p, columns=args.columns) for p in paths], ignore_index=True)
+        fences, rows = iqr_fences(df, args.columns, args.factor), len(df)
+    else:
+        fences, rows = parquet_fences(paths, args.columns, args.factor, args.k, args.workers)
+    for col, fence in fences.items():
+        print(f"{col}: Q1={fence['q1']:g} Q3={fence['q3']:g} -> [{fence['lower']:g}, {fence['upper']:g}]")
+    print(f"[DONE] {rows:,} filas de {len(paths)} archivos en {time.perf_counter() - started:.1f}s")
+    if args.output:
+        Path(args.output).write_text(json.dumps(fences, indent=2), encoding="utf-8")
+        print("[DONE] Vallas:", args.output)
+
+if __name__ == "__main__":
+    main()
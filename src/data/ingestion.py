@@ -1,26 +1,237 @@
 # -*- coding: utf-8 -*-
+"""
+src/data/ingestion.py
+Pipeline raw -> processed: JSONL de los scrapers (data/raw) y del stream
+(data/stream_ws_*.jsonl) a datasets Parquet particionados en data/processed.
+
+Cada archivo se divide en rangos de bytes alineados a líneas que se procesan en
+un pool de procesos; cada rango se lee en streaming y se escribe con ParquetSink en
+archivos intermedios (data/processed/.staging), así que la memoria por proceso no
+depende del tamaño del archivo. Al terminar los rangos de una entrada, sus archivos
+intermedios se compactan en uno por partición con row groups completos y un único
+esquema: las columnas que en un rango venían vacías toman el tipo del resto de rangos
+o el de los archivos ya escritos del dataset. Un manifiesto
+(`_manifest.json`) guarda tamaño, mtime, sha256 y archivos generados por entrada:
+en la siguiente ejecución sólo se procesan entradas nuevas o modificadas, y las
+salidas anteriores de una entrada modificada se borran antes de regenerarla.
+
+Uso:
+  python -m src.data.ingestion data/raw data/processed
+"""
 import click
+import glob
+import hashlib
+import json
 import logging
+import os
+import shutil
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from dotenv import find_dotenv, load_dotenv
 
+from .sinks import (DEFAULT_ROW_GROUP_SIZE, ParquetSink, compact_parts, dataset_name, dataset_schema,
+                    storable_schema)
+
+MANIFEST_NAME = "_manifest.json"
+# Con punto delante: pyarrow.dataset y src/data/query.py no lo toman por un dataset.
+STAGING_DIR = ".staging"
+DEFAULT_STREAM_GLOB = "data/stream_ws_*.jsonl"
+DEFAULT_CHUNK_MB = 64
+
+def discover_inputs(input_filepath, stream_glob):
+    """Archivos JSONL de entrada, ordenados y sin repetidos."""
+    paths = set(Path(input_filepath).rglob("*.jsonl"))
+    if stream_glob:
+        # stream_ws_probe_*.jsonl sólo contiene la línea de prueba de permisos.
+        paths.update(Path(p) for p in glob.glob(stream_glob) if not Path(p).name.startswith("stream_ws_probe"))
+    return sorted(paths)
+
+def file_checksum(path, size=None, block_size=1024 * 1024):
+    """sha256 del archivo, o de sus primeros `size` bytes si sigue creciendo."""
+    digest = hashlib.sha256()
+    remaining = path.stat().st_size if size is None else size
+    with open(path, "rb") as f:
+        while remaining > 0:
+            block = f.read(min(block_size, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+def load_manifest(output_filepath):
+    path = Path(output_filepath) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(output_filepath, manifest):
+    path = Path(output_filepath) / MANIFEST_NAME
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def plan(inputs, manifest, force=False):
+    """
+    Devuelve (pendientes, sin_cambios). Un archivo con el mismo tamaño y mtime que en
+    el manifiesto no se vuelve a leer; si sólo cambió el mtime, se compara el checksum.
+    """
+    pending, unchanged = [], []
+    for path in inputs:
+        key = str(path)
+        stat = path.stat()
+        entry = manifest.get(key)
+        if not force and entry and entry["size"] == stat.st_size:
+            if entry["mtime"] == stat.st_mtime:
+                unchanged.append(key)
+                continue
+            checksum = file_checksum(path)
+            if checksum == entry["sha256"]:
+                entry["mtime"] = stat.st_mtime
+                unchanged.append(key)
+                continue
+        pending.append(path)
+    return pending, unchanged
+
+def split_ranges(size, chunk_bytes):
+    """Rangos [inicio, fin) de ~chunk_bytes; cada línea pertenece al rango donde empieza."""
+    return [(start, min(start + chunk_bytes, size)) for start in range(0, size, chunk_bytes)] or [(0, 0)]
+
+def ingest_range(path, start, end, dataset, staging_dir, row_group_size):
+    """
+    Procesa las líneas que empiezan en [start, end) y devuelve filas, descartes y los
+    archivos intermedios escritos en `staging_dir` (ver `merge_ranges`).
+    """
+    rows = bad = 0
+    sink = ParquetSink(staging_dir, dataset, row_group_size=row_group_size, flush_interval=float("inf"), spill=True)
+    with open(path, "rb") as f, sink:
+        if start:
+            # Se posiciona en el byte anterior: si era un salto de línea, el rango empieza
+            # justo en una línea; si no, la línea a medias pertenece al rango previo.
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                bad += 1
+                continue
+            # Líneas de prueba del stream (permisos/ruta), no son datos.
+            if not isinstance(record, dict) or record.get("_probe"):
+                bad += 1
+                continue
+            sink.write(record)
+            rows += 1
+    return {"rows": rows, "bad": bad, "files": [str(p) for p in sink.paths]}
+
+def merge_ranges(files, staging_dir, dataset, output_filepath, row_group_size):
+    """
+    Compacta los archivos intermedios de una entrada: un archivo por partición en
+    `output_filepath/dataset`, todos con el mismo esquema. Borra `staging_dir` al acabar.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        if not files:
+            return []
+        root = Path(staging_dir) / dataset
+        partitions = defaultdict(list)
+        for f in files:
+            partitions[Path(f).parent.relative_to(root)].append(f)
+        schema = pa.unify_schemas([pq.read_schema(f) for f in files], promote_options="permissive")
+        schema = storable_schema(schema, dataset_schema(Path(output_filepath) / dataset))
+        return [str(compact_parts(paths, Path(output_filepath) / dataset / part, schema, row_group_size))
+                for part, paths in sorted(partitions.items())]
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+def remove_outputs(entry):
+    for part in entry.get("files", []):
+        try:
+            os.remove(part)
+        except FileNotFoundError:
+            pass
 
 @click.command()
 @click.argument('input_filepath', type=click.Path(exists=True))
 @click.argument('output_filepath', type=click.Path())
-def main(input_filepath, output_filepath):
+@click.option('--stream-glob', default=DEFAULT_STREAM_GLOB, show_default=True,
+              help='Archivos del stream WebSocket a incluir ("" para ninguno)')
+@click.option('--workers', type=int, default=os.cpu_count(), show_default=True, help='Procesos del pool')
+@click.option('--chunk-mb', type=int, default=DEFAULT_CHUNK_MB, show_default=True, help='Tamaño de cada rango de lectura')
+@click.option('--row-group-size', type=int, default=DEFAULT_ROW_GROUP_SIZE, show_default=True, help='Filas por row group')
+@click.option('--force', is_flag=True, help='Reprocesa todo, ignorando el manifiesto')
+def main(input_filepath, output_filepath, stream_glob, workers, chunk_mb, row_group_size, force):
     """ Runs data processing scripts to turn raw data from (../raw) into
         cleaned data ready to be analyzed (saved in ../processed).
     """
     logger = logging.getLogger(__name__)
     logger.info('making final data set from raw data')
 
+    Path(output_filepath).mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(output_filepath)
+    inputs = discover_inputs(input_filepath, stream_glob)
+    pending, unchanged = plan(inputs, manifest, force)
+    logger.info('%d entradas: %d nuevas o modificadas, %d sin cambios', len(inputs), len(pending), len(unchanged))
+
+    chunk_bytes = chunk_mb * 1024 * 1024
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for path in pending:
+            key = str(path)
+            if key in manifest:
+                remove_outputs(manifest[key])
+            # Los archivos del stream del día siguen creciendo: el manifiesto guarda el
+            # tamaño al empezar, así que la cola nueva fuerza a reprocesarlo la próxima vez.
+            stat = path.stat()
+            dataset = dataset_name(path)
+            staging = Path(output_filepath) / STAGING_DIR / uuid.uuid4().hex
+            futures[key] = (path, stat, dataset, staging, [
+                pool.submit(ingest_range, path, start, end, dataset, str(staging), row_group_size)
+                for start, end in split_ranges(stat.st_size, chunk_bytes)
+            ])
+
+        for key, (path, stat, dataset, staging, parts) in futures.items():
+            results = [future.result() for future in parts]
+            spilled = [f for r in results for f in r["files"]]
+            files = pool.submit(merge_ranges, spilled, str(staging), dataset, output_filepath, row_group_size).result()
+            manifest[key] = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "sha256": file_checksum(path, stat.st_size),
+                "dataset": dataset,
+                "rows": sum(r["rows"] for r in results),
+                "bad_lines": sum(r["bad"] for r in results),
+                "files": files,
+            }
+            logger.info('%s -> %s: %d filas, %d descartadas', key, dataset,
+                        manifest[key]["rows"], manifest[key]["bad_lines"])
+            # Se guarda tras cada entrada: si el proceso se corta, lo hecho no se repite.
+            save_manifest(output_filepath, manifest)
+
+    save_manifest(output_filepath, manifest)
+    try:
+        os.rmdir(Path(output_filepath) / STAGING_DIR)
+    except OSError:
+        pass
+    logger.info('listo: %d entradas procesadas en %s', len(pending), output_filepath)
+
 
 if __name__ == '__main__':
     log_fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     logging.basicConfig(level=logging.INFO, format=log_fmt)
 
-    # not used in this stub but often useful for finding various files
+    # not used here but often useful for finding various files
     project_dir = Path(__file__).resolve().parents[2]
 
     # find .env automagically by walking up directories until it's found, then
@@ -0,0 +1,282 @@
+"""
+src/data/profiling.py
+Perfilado de calidad en una sola pasada para las salidas JSONL de los scrapers.
+
+`StreamingProfiler` consume registros uno a uno (de una lista, de un generador o
+directamente de un archivo con `iter_jsonl`) y sólo guarda contadores más los
+conjuntos de url/id para los duplicados, así que sirve para archivos de varios GB.
+Con `approx=True` esos conjuntos se sustituyen por HyperLogLog + filtro de Bloom
+(src/data/sketches.py) y la memoria queda fija; el reporte indica las cotas de error.
+Reúne las reglas de `profile()` (src/main.py) y de `generate_data_quality_report()`
+(src/scraper.py) como dos estilos, cada uno con su propio render en Markdown.
+
+Uso:
+  python -m src.data.profiling data/raw/noticias.jsonl --style main --output reports/perfilado.md
+  python -m src.data.profiling data/raw/noticias.jsonl --approx --duplicates-out reports/urls_duplicadas.txt
+"""
+import argparse
+import json
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .sketches import BloomFilter, HyperLogLog, SortedSpill
+
+DEFAULT_APPROX_CAPACITY = 10_000_000
+DEFAULT_APPROX_ERROR = 0.001
+DEFAULT_HLL_PRECISION = 14
+
+MAIN_FIELDS = ["id", "titulo", "fecha", "url", "fuente", "autor", "capturado_ts"]
+DATE_FORMAT_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+URL_FORMAT_RE = re.compile(r'^https?://')
+
+def _is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+def _valid_url(value):
+    import validators
+    return bool(validators.url(value or ""))
+
+# Reglas de cada estilo: qué cuenta como nulo y cómo se validan fecha y URL.
+STYLES = {
+    # src/main.py: fecha ISO con hora, URL validada con `validators`.
+    "main": {
+        "fields": MAIN_FIELDS,
+        "is_null": lambda v: not v,
+        "valid_date": lambda v: bool(v),
+        "valid_url": _valid_url,
+    },
+    # src/scraper.py: fecha YYYY-MM-DD, URL con prefijo http(s)://, campos del primer registro.
+    "scraper": {
+        "fields": None,
+        "is_null": _is_blank,
+        "valid_date": lambda v: bool(v and DATE_FORMAT_RE.match(v)),
+        "valid_url": lambda v: bool(v and URL_FORMAT_RE.match(v)),
+    },
+}
+
+def iter_jsonl(path):
+    """Genera los registros de un archivo JSONL sin cargarlo entero en memoria."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+class ExactDistinct:
+    """Distintos y duplicados exactos con un set en memoria."""
+    def __init__(self):
+        self.values = set()
+        self.duplicates = 0
+
+    def add(self, value):
+        if value in self.values:
+            self.duplicates += 1
+        else:
+            self.values.add(value)
+
+    def distinct(self):
+        return len(self.values)
+
+class ApproxDistinct:
+    """
+    Distintos estimados con HyperLogLog y duplicados contados con un filtro de Bloom.
+    Los falsos positivos del Bloom sólo pueden inflar el número de duplicados.
+    """
+    def __init__(self, capacity=DEFAULT_APPROX_CAPACITY, error_rate=DEFAULT_APPROX_ERROR,
+                 precision=DEFAULT_HLL_PRECISION):
+        self.hll = HyperLogLog(precision)
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.duplicates = 0
+
+    def add(self, value):
+        self.hll.add(value)
+        if self.bloom.add(value):
+            self.duplicates += 1
+
+    def distinct(self):
+        return self.hll.count()
+
+class StreamingProfiler:
+    def __init__(self, style="main", approx=False, capacity=DEFAULT_APPROX_CAPACITY,
+                 error_rate=DEFAULT_APPROX_ERROR):
+        rules = STYLES[style]
+        self.style = style
+        self.fields = list(rules["fields"]) if rules["fields"] else None
+        self._is_null = rules["is_null"]
+        self._valid_date = rules["valid_date"]
+        self._valid_url = rules["valid_url"]
+
+        self.total = 0
+        self.source = None
+        self.null_counts = {}
+        self.approx = approx
+        if approx:
+            self.urls = ApproxDistinct(capacity, error_rate)
+            self.ids = ApproxDistinct(capacity, error_rate)
+        else:
+            self.urls = ExactDistinct()
+            self.ids = ExactDistinct()
+        self.valid_dates = 0
+        self.valid_urls = 0
+
+    def update(self, record):
+        if self.fields is None:
+            self.fields = list(record.keys())
+        if self.total == 0:
+            self.source = record.get("fuente")
+        self.total += 1
+
+        for field in self.fields:
+            if self._is_null(record.get(field)):
+                self.null_counts[field] = self.null_counts.get(field, 0) + 1
+        url = record.get("url")
+        self.urls.add(url)
+        self.ids.add(record.get("id"))
+        if self._valid_date(record.get("fecha")):
+            self.valid_dates += 1
+        if self._valid_url(url):
+            self.valid_urls += 1
+
+    def consume(self, records):
+        for record in records:
+            self.update(record)
+        return self
+
+    def result(self):
+        total = self.total
+
+        def pct(count):
+            return (count / total * 100) if total else 0
+
+        approx = None
+        if self.approx:
+            bloom = self.urls.bloom
+            approx = {
+                "hll_precision": self.urls.hll.p,
+                "distinct_rel_error": self.urls.hll.relative_error,
+                "bloom_capacity": bloom.capacity,
+                "bloom_error_rate": max(self.urls.bloom.current_error_rate, self.ids.bloom.current_error_rate),
+                "memory_mb": 2 * (bloom.memory_bytes + self.urls.hll.m) / 1024 / 1024,
+            }
+        return {
+            "total": total,
+            "source": self.source,
+            "nulls": {f: {"count": self.null_counts.get(f, 0), "pct": pct(self.null_counts.get(f, 0))}
+                      for f in (self.fields or [])},
+            "unique": {"by_url": self.urls.distinct(), "by_id": self.ids.distinct()},
+            "duplicates": {"by_url": self.urls.duplicates, "by_id": self.ids.duplicates},
+            "valid_dates": {"count": self.valid_dates, "pct": pct(self.valid_dates)},
+            "valid_urls": {"count": self.valid_urls, "pct": pct(self.valid_urls)},
+            "approx": approx,
+        }
+
+def profile_jsonl(path, style="main", approx=False, **kwargs):
+    return StreamingProfiler(style, approx=approx, **kwargs).consume(iter_jsonl(path)).result()
+
+def render_approx_notes(stats):
+    """Sección con las cotas de error del modo aproximado (vacía en modo exacto)."""
+    approx = stats.get("approx")
+    if not approx:
+        return []
+    total = stats["total"]
+    return [
+        "\n## Modo aproximado\n",
+        f"- **Valores distintos** (url/id): estimados con HyperLogLog (p={approx['hll_precision']}), "
+        f"error estándar relativo ±{approx['distinct_rel_error']:.2%}.",
+        f"- **Duplicados**: contados con filtro de Bloom (capacidad {approx['bloom_capacity']:,}); "
+        f"tasa de falsos positivos estimada {approx['bloom_error_rate']:.4%}, es decir, "
+        f"hasta ~{approx['bloom_error_rate'] * total:.0f} duplicados de más.",
+        f"- **Memoria de las estructuras**: {approx['memory_mb']:.1f} MB, independiente del número de registros.",
+    ]
+
+def render_profile_md(stats):
+    """Reporte con el formato de `write_profile_md` de src/main.py."""
+    lines = [
+        "# Perfilado de Calidad\n",
+        f"- **Total de registros**: {stats['total']}",
+        f"- **Duplicados por URL**: {stats['duplicates']['by_url']}",
+        f"- **Duplicados por id**: {stats['duplicates']['by_id']}\n",
+        "## Valores nulos por campo\n",
+    ]
+    for field, info in stats["nulls"].items():
+        lines.append(f"- {field}: {info['count']} ({info['pct']:.2f}%)")
+    lines.extend([
+        "",
+        f"- **Fechas válidas**: {stats['valid_dates']['count']} ({stats['valid_dates']['pct']:.2f}%)",
+        f"- **URLs válidas**: {stats['valid_urls']['count']} ({stats['valid_urls']['pct']:.2f}%)",
+    ])
+    lines.extend(render_approx_notes(stats))
+    return "\n".join(lines) + "\n"
+
+def render_quality_report(stats):
+    """Reporte con el formato de `generate_data_quality_report` de src/scraper.py."""
+    total_records = stats["total"]
+    if not total_records:
+        return "No se encontraron registros para analizar."
+
+    report = [
+        f"# Reporte de Calidad de Datos - {datetime.now(timezone.utc).date()}",
+        f"**Fuente de Datos:** {stats['source'] or 'N/A'}\n",
+        "## 1. Resumen General",
+        f"- **Número total de registros:** {total_records}\n",
+        "## 2. Completitud (Valores Nulos)",
+        "| Campo          | % Nulos |",
+        "|----------------|---------|",
+    ]
+    for field, info in stats["nulls"].items():
+        report.append(f"| {field:<14} | {info['pct']:.2f}%   |")
+
+    unique_ids = stats["unique"]["by_id"]
+    unique_urls = stats["unique"]["by_url"]
+    report.extend([
+        "\n## 3. Unicidad",
+        f"- **IDs únicos:** {unique_ids} de {total_records} (Duplicados: {total_records - unique_ids})",
+        f"- **URLs únicas:** {unique_urls} de {total_records} (Duplicados: {total_records - unique_urls})\n",
+        "## 4. Consistencia de Formato",
+        f"- **Fechas en formato YYYY-MM-DD:** {stats['valid_dates']['count'] / total_records:.2%}",
+        f"- **URLs con prefijo http(s)://:** {stats['valid_urls']['count'] / total_records:.2%}"
+    ])
+    report.extend(render_approx_notes(stats))
+    return "\n".join(report)
+
+RENDERERS = {"main": render_profile_md, "scraper": render_quality_report}
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfilado de calidad en streaming de un archivo JSONL")
+    parser.add_argument("input", help="Archivo JSONL a perfilar")
+    parser.add_argument("--style", choices=STYLES.keys(), default="main", help="Reglas y formato del reporte")
+    parser.add_argument("--output", default="reports/perfilado.md", help="Ruta del reporte Markdown")
+    parser.add_argument("--approx", action="store_true", help="Distintos/duplicados aproximados con memoria fija")
+    parser.add_argument("--approx-capacity", type=int, default=DEFAULT_APPROX_CAPACITY, help="Registros previstos (tamaño del filtro de Bloom)")
+    parser.add_argument("--duplicates-out", default=None, help="Lista exacta de URLs duplicadas (ordenación en disco)")
+    args = parser.parse_args()
+
+    records = iter_jsonl(args.input)
+    spill = None
+    if args.duplicates_out:
+        spill = SortedSpill()
+        records = _tee_urls(records, spill)
+    profiler = StreamingProfiler(args.style, approx=args.approx, capacity=args.approx_capacity)
+    stats = profiler.consume(records).result()
+
+    out = Path(args.output)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(RENDERERS[args.style](stats), encoding="utf-8")
+    print(f"[DONE] {stats['total']} registros perfilados; reporte en {out}")
+
+    if spill is not None:
+        dup_out = Path(args.duplicates_out)
+        dup_out.parent.mkdir(parents=True, exist_ok=True)
+        with dup_out.open("w", encoding="utf-8") as f:
+            for url, count in spill.duplicates():
+                f.write(f"{count}\t{url}\n")
+        spill.cleanup()
+        print(f"[DONE] URLs duplicadas en {dup_out}")
+
+def _tee_urls(records, spill):
+    for record in records:
+        spill.add(record.get("url"))
+        yield record
+
+if __name__ == "__main__":
+    main()
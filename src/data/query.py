@@ -0,0 +1,219 @@
+"""
+src/data/query.py
+Capa de consulta SQL embebida (DuckDB) sobre los archivos del proyecto, sin cargarlos en Python.
+
+Al abrir el lago se registran vistas en dos esquemas:
+- `raw.<dataset>`: JSONL de data/raw (y del stream, data/stream_ws_*.jsonl), un dataset
+  por nombre de archivo sin fecha (ver `dataset_name`).
+- `processed.<dataset>`: datasets Parquet de data/processed con las particiones Hive
+  `date=`/`source=` como columnas.
+
+Las vistas sólo guardan la consulta: DuckDB lee los archivos en cada consulta con
+varios hilos, leyendo sólo las columnas usadas y, en Parquet, descartando row groups
+y particiones por los filtros. `check_contract` ejecuta tal cual las expresiones SQL
+de `quality_assertions` del contrato (contracts/schema.yaml) sobre una vista, con
+casts explícitos donde el contrato compara texto con fechas. Las líneas JSONL mal
+formadas no se descartan: la consulta falla y el contrato no se da por cumplido.
+
+Uso:
+  python -m src.data.query --list
+  python -m src.data.query "SELECT fuente, COUNT(*) FROM raw.noticias GROUP BY 1"
+  python -m src.data.query --check raw.noticias --contract contracts/schema.yaml
+"""
+import argparse
+import glob
+import os
+from pathlib import Path
+
+from .sinks import dataset_name
+from .validation import ASSERT_NOT_FUTURE_RE, DEFAULT_CONTRACT, SAMPLE_ROWS, load_contract, render_validation_md
+
+DEFAULT_RAW_DIR = "data/raw"
+DEFAULT_PROCESSED_DIR = "data/processed"
+# Mismo patrón que src/data/ingestion.py (no se importa para no depender de click).
+DEFAULT_STREAM_GLOB = "data/stream_ws_*.jsonl"
+
+def _require_duckdb():
+    try:
+        import duckdb
+    except ImportError:
+        raise SystemExit("Falta 'duckdb'. Instala con: pip install duckdb")
+    return duckdb
+
+def _ident(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+def _sql_expression(expression):
+    """
+    Expresión del contrato lista para DuckDB. `fecha <= CURRENT_DATE` compara texto con
+    una fecha: se castea con TRY_CAST y, como en ContractValidator, un valor que no es
+    fecha no cuenta aquí (lo detecta la regla de formato).
+    """
+    expression = " ".join(str(expression).split())
+    match = ASSERT_NOT_FUTURE_RE.match(expression)
+    if match:
+        column = _ident(match.group(1))
+        return (f"{column} IS NULL OR TRY_CAST({column} AS DATE) IS NULL "
+                f"OR TRY_CAST({column} AS DATE) <= CURRENT_DATE")
+    return expression
+
+class DataLake:
+    """Conexión DuckDB con las vistas `raw.*` y `processed.*` registradas."""
+    def __init__(self, raw_dir=DEFAULT_RAW_DIR, processed_dir=DEFAULT_PROCESSED_DIR,
+                 stream_glob=DEFAULT_STREAM_GLOB, threads=None, database=":memory:"):
+        self.duckdb = _require_duckdb()
+        self.con = self.duckdb.connect(database)
+        self.con.execute(f"SET threads = {int(threads or os.cpu_count() or 1)}")
+        self.views = {}
+        self.errors = {}              # vista -> error de lectura (no se registra)
+        self.con.execute("CREATE SCHEMA IF NOT EXISTS raw")
+        self.con.execute("CREATE SCHEMA IF NOT EXISTS processed")
+        self._register_raw(raw_dir, stream_glob)
+        self._register_processed(processed_dir)
+
+    def _register_raw(self, raw_dir, stream_glob):
+        paths = set(Path(raw_dir).rglob("*.jsonl")) if Path(raw_dir).exists() else set()
+        if stream_glob:
+            paths.update(Path(p) for p in glob.glob(stream_glob) if not Path(p).name.startswith("stream_ws_probe"))
+        datasets = {}
+        for path in sorted(paths):
+            datasets.setdefault(dataset_name(path), []).append(str(path))
+        for name, files in datasets.items():
+            # Sin inferencia de fechas: el contrato valida `fecha` como texto.
+            try:
+                self._create_view("raw", name, (
+                    f"SELECT * FROM read_json_auto([{', '.join(map(_literal, files))}], "
+                    "format = 'newline_delimited', union_by_name = true, "
+                    "dateformat = 'disabled', timestampformat = 'disabled')"
+                ))
+            except self.duckdb.InvalidInputException as e:
+                self.errors[f"raw.{name}"] = str(e).splitlines()[0]
+                print(f"[WARN] raw.{name} no se registra: {self.errors[f'raw.{name}']}")
+
+    def _register_processed(self, processed_dir):
+        root = Path(processed_dir)
+        if not root.exists():
+            return
+        # `.staging` (src/data/ingestion.py) y similares no son datasets.
+        for dataset in sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith((".", "_"))):
+            if not any(dataset.rglob("*.parquet")):
+                continue
+            pattern = _literal(str(dataset / "**" / "*.parquet"))
+            self._create_view("processed", dataset.name, (
+                f"SELECT * FROM read_parquet({pattern}, hive_partitioning = true, union_by_name = true)"
+            ))
+
+    def _create_view(self, schema, name, select):
+        qualified = f"{schema}.{_ident(name)}"
+        self.con.execute(f"CREATE OR REPLACE VIEW {qualified} AS {select}")
+        self.views[f"{schema}.{name}"] = qualified
+
+    def _view(self, view):
+        """Nombre calificado de una vista registrada ("raw.noticias") o la expresión tal cual."""
+        return self.views.get(view, view)
+
+    def sql(self, query, params=None):
+        """Ejecuta una consulta y devuelve un DataFrame."""
+        return self.con.execute(query, params or []).df()
+
+    def count(self, view, where=None):
+        query = f"SELECT COUNT(*) FROM {self._view(view)}"
+        if where:
+            query += f" WHERE {where}"
+        return self.con.execute(query).fetchone()[0]
+
+    def _assertion(self, view, expression):
+        """
+        (violaciones, muestras) de una expresión. Las expresiones por fila cuentan las
+        filas que no la cumplen; las agregadas (COUNT, SUM...) no se pueden usar en un
+        WHERE, así que se evalúan sobre toda la vista y cuentan 1 si son falsas.
+        """
+        source = self._view(view)
+        failing = f"NOT COALESCE(({expression}), false)"
+        try:
+            violations = self.con.execute(f"SELECT COUNT(*) FROM {source} WHERE {failing}").fetchone()[0]
+        except self.duckdb.BinderException:
+            ok = self.con.execute(f"SELECT ({expression}) FROM {source}").fetchone()[0]
+            return (0 if ok else 1), []
+        samples = []
+        if violations:
+            rows = self.con.execute(f"SELECT * FROM {source} WHERE {failing} LIMIT {SAMPLE_ROWS}").df()
+            samples = rows.astype(object).where(rows.notna(), None).to_dict("records")
+        return violations, samples
+
+    def check_contract(self, view, contract=DEFAULT_CONTRACT):
+        """
+        Ejecuta las `quality_assertions` del contrato; mismo formato que ContractValidator.result().
+        Si la vista no se puede leer (p. ej. JSONL mal formado) lanza la excepción de DuckDB.
+        """
+        if isinstance(contract, (str, Path)):
+            contract = load_contract(contract)
+        if view in self.errors:
+            raise self.duckdb.InvalidInputException(self.errors[view])
+        total = self.count(view)
+        rules, unsupported = {}, []
+        for assertion in contract.get("quality_assertions", []) or []:
+            try:
+                violations, samples = self._assertion(view, _sql_expression(assertion["expression"]))
+            except self.duckdb.Error as e:
+                unsupported.append(f"{assertion['check']} ({str(e).splitlines()[0]})")
+                continue
+            rules[assertion["check"]] = {"violations": violations, "samples": samples}
+        return {
+            "contract": contract.get("contract_name"),
+            "total": total,
+            "rules": rules,
+            "unsupported": unsupported,
+            "ok": not unsupported and all(r["violations"] == 0 for r in rules.values()),
+        }
+
+    def close(self):
+        self.con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas SQL (DuckDB) sobre data/raw y data/processed")
+    parser.add_argument("query", nargs="?", help="Consulta SQL, p. ej. SELECT COUNT(*) FROM raw.noticias")
+    parser.add_argument("--raw-dir", default=DEFAULT_RAW_DIR, help="JSONL de entrada (esquema raw)")
+    parser.add_argument("--processed-dir", default=DEFAULT_PROCESSED_DIR, help="Datasets Parquet (esquema processed)")
+    parser.add_argument("--stream-glob", default=DEFAULT_STREAM_GLOB, help='Archivos del stream a incluir en raw ("" para ninguno)')
+    parser.add_argument("--threads", type=int, default=None, help="Hilos de DuckDB (por defecto, todas las CPU)")
+    parser.add_argument("--list", action="store_true", help="Lista las vistas registradas")
+    parser.add_argument("--check", default=None, metavar="VISTA", help="Ejecuta las quality_assertions del contrato sobre la vista")
+    parser.add_argument("--contract", default=DEFAULT_CONTRACT, help="Ruta del contrato YAML")
+    parser.add_argument("--output", default=None, help="Reporte Markdown opcional de --check")
+    args = parser.parse_args()
+
+    with DataLake(args.raw_dir, args.processed_dir, args.stream_glob, args.threads) as lake:
+        if args.list:
+            for view in lake.views:
+                print(view)
+        if args.query:
+            print(lake.sql(args.query).to_string(index=False))
+        if args.check:
+            try:
+                result = lake.check_contract(args.check, args.contract)
+            except lake.duckdb.InvalidInputException as e:
+                raise SystemExit(f"✗ No se pudo leer {args.check}: {str(e).splitlines()[0]}")
+            for name, info in result["rules"].items():
+                mark = "✓" if info["violations"] == 0 else "✗"
+                print(f"{mark} {name}: {info['violations']}")
+            for name in result["unsupported"]:
+                print(f"[WARN] Aserción no ejecutada: {name}")
+            if args.output:
+                out = Path(args.output)
+                out.parent.mkdir(parents=True, exist_ok=True)
+                out.write_text(render_validation_md(result), encoding="utf-8")
+                print(f"[DONE] Reporte de validación en {out}")
+            raise SystemExit(0 if result["ok"] else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+src/data/retail.py
+Carga rápida del dataset Online Retail II (online_retail_II.xlsx) para los notebooks.
+
+Leer las dos hojas del Excel (~1M filas) tarda minutos, así que la primera vez se
+convierte el libro a un Parquet tipado en `data/interim/` cuyo nombre lleva el hash
+del archivo; las siguientes cargas leen ese Parquet en segundos. Si el Excel cambia,
+cambia el hash y se regenera la caché.
+
+Los tipos se fijan al leer, no después: categóricas para `StockCode`, `Country` y
+`Description`, `InvoiceDate` como datetime64 y numéricos reducidos (Quantity int32,
+Price float32, Customer ID Int32 con nulos). Junto al Parquet se guarda la memoria
+que ocupaba el DataFrame con los tipos por defecto para el reporte antes/después.
+
+Uso:
+  python -m src.data.retail online_retail_II.xlsx --cache-dir data/interim
+"""
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import pandas as pd
+
+DEFAULT_CACHE_DIR = "data/interim"
+SHEETS = ("Year 2009-2010", "Year 2010-2011")
+# Cambiar la versión invalida las cachés generadas con otros tipos.
+CACHE_VERSION = 1
+
+READ_DTYPES = {
+    "Invoice": "string",
+    "StockCode": "category",
+    "Description": "category",
+    "Country": "category",
+}
+DOWNCAST = {"Quantity": "int32", "Price": "float32", "Customer ID": "Int32"}
+
+def file_hash(path, block_size=1024 * 1024):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+def cache_path(path, cache_dir=DEFAULT_CACHE_DIR):
+    return Path(cache_dir) / f"{Path(path).stem}_v{CACHE_VERSION}_{file_hash(path)}.parquet"
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
+
+def _default_types_mb(df):
+    """Memoria del mismo DataFrame con los tipos que pondría `pd.read_excel` sin `dtype`."""
+    naive = df.astype({c: "object" for c in df.columns
+                       if isinstance(df[c].dtype, (pd.CategoricalDtype, pd.StringDtype))}).infer_objects()
+    naive = naive.astype({c: "float64" if df[c].hasnans else "int64"
+                          for c in DOWNCAST if c in df.columns})
+    return memory_mb(naive)
+
+def read_workbook(path, sheets=SHEETS):
+    """Lee las hojas con tipos explícitos y las une. Es la parte lenta (sólo sin caché)."""
+    frames = pd.read_excel(path, sheet_name=list(sheets), dtype=READ_DTYPES)
+    df = pd.concat(frames.values(), ignore_index=True)
+    # concat de categóricas con categorías distintas devuelve object: se recategoriza una vez.
+    for col, dtype in READ_DTYPES.items():
+        if col in df.columns and df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    df["InvoiceDate"] = pd.to_datetime(df["InvoiceDate"], errors="coerce")
+    for col, dtype in DOWNCAST.items():
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+    return df
+
+def load_retail(path="online_retail_II.xlsx", cache_dir=DEFAULT_CACHE_DIR, refresh=False, verbose=True):
+    """DataFrame tipado del Online Retail II, desde la caché Parquet si existe."""
+    started = time.perf_counter()
+    cached = cache_path(path, cache_dir)
+    meta_path = cached.with_suffix(".json")
+    if cached.exists() and not refresh:
+        df = pd.read_parquet(cached)
+        meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.exists() else {}
+        origin = "caché"
+    else:
+        df = read_workbook(path)
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix(".parquet.tmp")
+        df.to_parquet(tmp, index=False)
+        tmp.replace(cached)
+        meta = {"source": str(path), "rows": len(df), "default_types_mb": round(_default_types_mb(df), 1)}
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+        origin = "Excel"
+    if verbose:
+        print(f"✅ Online Retail II desde {origin}: {len(df):,} filas en {time.perf_counter() - started:.1f}s ({cached})")
+        print(memory_report(df, meta.get("default_types_mb")))
+    return df
+
+def memory_report(df, default_types_mb=None):
+    lines = []
+    if default_types_mb is not None:
+        lines.append(f"💾 Memoria con tipos por defecto: {default_types_mb:,.1f} MB")
+    lines.append(f"💾 Memoria con tipos explícitos: {memory_mb(df):,.1f} MB")
+    if default_types_mb:
+        lines.append(f"   Reducción: {1 - memory_mb(df) / default_types_mb:.0%}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte online_retail_II.xlsx a una caché Parquet tipada")
+    parser.add_argument("input", nargs="?", default="online_retail_II.xlsx", help="Libro Excel")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Directorio de la caché")
+    parser.add_argument("--refresh", action="store_true", help="Regenera la caché aunque exista")
+    args = parser.parse_args()
+
+    df = load_retail(args.input, args.cache_dir, refresh=args.refresh)
+    print(df.dtypes.to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+src/data/sinks.py
+Escritores de larga duración para las salidas de los scrapers y del streaming.
+Todos exponen `write(record)`, `flush()`, `flush_if_due()`, `close()` y se usan
+como context manager; `open_sink(formato, ...)` elige la implementación.
+
+`JsonlSink` mantiene el archivo del día abierto y acumula las líneas en un buffer
+que se vuelca al disco cuando supera `flush_bytes` o cuando han pasado
+`flush_interval` segundos (opcionalmente con fsync). Ante una caída se pierde como
+mucho una ventana de volcado. La rotación diaria se decide comparando la hora con
+la medianoche precalculada, sin reconstruir la ruta en cada mensaje.
+
+`ParquetSink` escribe columnar (pyarrow) con particiones estilo Hive
+`<dataset>/date=YYYY-MM-DD/source=<fuente>/part-*.parquet`, row groups de tamaño
+fijo y codificación por diccionario en los campos de baja cardinalidad. Cada volcado
+genera archivos nuevos y completos (se escriben aparte y se renombran), de modo que
+una lectura concurrente nunca ve un Parquet a medias. Una columna sin ningún valor en
+un volcado se guarda como texto y no con el tipo `null` de Arrow, que no se puede leer
+junto con archivos donde la misma columna sí tiene datos.
+
+Uso (conversión de históricos JSONL):
+  python -m src.data.sinks data/raw/noticias.jsonl --dataset noticias --out-dir data/processed
+  python -m src.data.sinks data/stream_ws_*.jsonl --dataset trades
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DEFAULT_FLUSH_BYTES = 64 * 1024
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+DEFAULT_ROW_GROUP_SIZE = 64_000
+DEFAULT_PARQUET_FLUSH_INTERVAL = 60.0
+DICTIONARY_FIELDS = ("fuente", "source", "instrument", "currency", "autor", "interval")
+# Campos candidatos para las particiones, en orden de preferencia.
+DATE_FIELDS = ("ts", "fecha", "capturado_ts")
+SOURCE_FIELDS = ("source", "fuente")
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+PARTITION_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+class JsonlSink:
+    def __init__(self, out_dir, prefix, flush_bytes=DEFAULT_FLUSH_BYTES,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, fsync=False):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        self.path = None
+        self._file = None
+        self._rotate_at = 0.0
+        self._buffer = []
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self.records = 0
+        self.flushes = 0
+
+    def _open_for_today(self):
+        now = datetime.now()
+        self.path = self.out_dir / f"{self.prefix}_{now.strftime('%Y-%m-%d')}.jsonl"
+        self._file = self.path.open("ab")
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        self._rotate_at = midnight.timestamp()
+
+    def write(self, record):
+        self.write_raw(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def write_raw(self, line):
+        """Añade una línea ya serializada (bytes terminados en salto de línea)."""
+        if time.time() >= self._rotate_at:
+            # Lo acumulado pertenece al día anterior: se vuelca antes de rotar.
+            self.flush()
+            if self._file is not None:
+                self._file.close()
+            self._open_for_today()
+        self._buffer.append(line)
+        self._buffered += len(line)
+        self.records += 1
+        if self._buffered >= self.flush_bytes or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        self._file.write(b"".join(self._buffer))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._buffer = []
+        self._buffered = 0
+        self.flushes += 1
+
+    def flush_if_due(self):
+        """Vuelca sólo si ha pasado `flush_interval` desde el último volcado."""
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    async def autoflush(self):
+        """Tarea de fondo: vuelca el buffer aunque no lleguen mensajes nuevos."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush_if_due()
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("Falta 'pyarrow'. Instala con: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+class ParquetSink:
+    """
+    Acumula registros por partición (fecha, fuente) y los vuelca a Parquet cuando se
+    juntan `row_group_size` filas o pasan `flush_interval` segundos. Con `date_field`
+    o `source_field` en None se usa el primer campo candidato presente en el primer
+    registro. Un campo de partición que se llame igual que su clave Hive (`date`,
+    `source`) no se repite dentro de los archivos: lo aporta la ruta. El resto de
+    columnas, aunque se llamen así, se conservan.
+
+    Con `spill=True` los archivos son intermedios (ver `compact_parts`) y conservan las
+    columnas de tipo `null`, para que la compactación les dé el tipo definitivo.
+    """
+    def __init__(self, out_dir, dataset, date_field=None, source_field=None,
+                 row_group_size=DEFAULT_ROW_GROUP_SIZE, flush_interval=DEFAULT_PARQUET_FLUSH_INTERVAL,
+                 dictionary_fields=DICTIONARY_FIELDS, compression="zstd", spill=False):
+        self.pa, self.pq = _require_pyarrow()
+        self.path = Path(out_dir) / dataset
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.date_field = date_field
+        self.source_field = source_field
+        self.row_group_size = row_group_size
+        self.flush_interval = flush_interval
+        self.dictionary_fields = set(dictionary_fields)
+        self.compression = compression
+        self.spill = spill
+
+        self.schema = None
+        self._buffers = {}
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self.records = 0
+        self.flushes = 0
+        self.files = 0
+        self.paths = []
+        # Distingue los archivos de sinks sucesivos del mismo proceso (p. ej. un sink por
+        # rango en src/data/ingestion.py) aunque vuelquen en el mismo milisegundo.
+        self._token = uuid.uuid4().hex[:12]
+
+    def _partition(self, record):
+        if self.date_field is None:
+            self.date_field = next((f for f in DATE_FIELDS if f in record), DATE_FIELDS[0])
+        if self.source_field is None:
+            self.source_field = next((f for f in SOURCE_FIELDS if f in record), SOURCE_FIELDS[0])
+        day = str(record.get(self.date_field) or "")
+        day = day[:10] if PARTITION_DATE_RE.match(day) else NULL_PARTITION
+        source = str(record.get(self.source_field) or NULL_PARTITION).replace("/", "_")
+        return day, source
+
+    def write(self, record):
+        key = self._partition(record)
+        row = record
+        if self.date_field == "date" or self.source_field == "source":
+            hive = {f for f, k in ((self.date_field, "date"), (self.source_field, "source")) if f == k}
+            row = {k: v for k, v in record.items() if k not in hive}
+        self._buffers.setdefault(key, []).append(row)
+        self._buffered += 1
+        self.records += 1
+        if self._buffered >= self.row_group_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def write_raw(self, line):
+        """Compatibilidad con JsonlSink: acepta una línea JSON ya serializada."""
+        self.write(json.loads(line))
+
+    def _widen(self, rows):
+        """Amplía el esquema con las columnas y tipos de `rows` (nulos -> tipo real, int -> float...)."""
+        inferred = self.pa.Table.from_pylist(rows).schema
+        if self.schema is None:
+            self.schema = inferred
+        else:
+            self.schema = self.pa.unify_schemas([self.schema, inferred], promote_options="permissive")
+
+    def _table(self, rows):
+        # Todos los archivos del dataset comparten un esquema que sólo crece.
+        pa = self.pa
+        if self.schema is None or not set().union(*rows) <= set(self.schema.names):
+            self._widen(rows)
+        try:
+            return pa.Table.from_pylist(rows, schema=self.schema)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            self._widen(rows)
+            return pa.Table.from_pylist(rows, schema=self.schema)
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffered:
+            return
+        stamp = int(time.time() * 1000)
+        for (day, source), rows in self._buffers.items():
+            table = self._table(rows)
+            if not self.spill:
+                table = _storable(table)
+            part_dir = self.path / f"date={day}" / f"source={source}"
+            part_dir.mkdir(parents=True, exist_ok=True)
+            # El pid y el token evitan colisiones entre procesos y entre sinks del mismo proceso.
+            final = part_dir / part_filename(stamp, self._token, self.files)
+            tmp = final.with_suffix(".parquet.tmp")
+            dictionary = [c for c in table.column_names if c in self.dictionary_fields]
+            self.pq.write_table(table, tmp, row_group_size=self.row_group_size,
+                                use_dictionary=dictionary, compression=self.compression)
+            os.replace(tmp, final)
+            self.paths.append(final)
+            self.files += 1
+        self._buffers = {}
+        self._buffered = 0
+        self.flushes += 1
+
+    def flush_if_due(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    async def autoflush(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush_if_due()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def part_filename(stamp, token, index):
+    return f"part-{stamp}-{os.getpid()}-{token}-{index:05d}.parquet"
+
+def storable_schema(schema, reference=None):
+    """
+    `schema` sin campos de tipo `null`: toman el tipo del mismo campo en `reference`
+    (p. ej. el esquema de los archivos ya escritos del dataset) o, si no lo hay, texto.
+    """
+    pa, _ = _require_pyarrow()
+    fields = []
+    for field in schema:
+        if pa.types.is_null(field.type):
+            known = reference.field(field.name).type if reference is not None and field.name in reference.names else None
+            field = field.with_type(known if known is not None and not pa.types.is_null(known) else pa.string())
+        fields.append(field)
+    return pa.schema(fields, metadata=schema.metadata)
+
+def _storable(table):
+    pa, _ = _require_pyarrow()
+    if not any(pa.types.is_null(field.type) for field in table.schema):
+        return table
+    return table.cast(storable_schema(table.schema))
+
+def _conform(table, schema):
+    """`table` con exactamente las columnas y tipos de `schema` (las que falten, nulas)."""
+    pa, _ = _require_pyarrow()
+    columns = [table.column(field.name).cast(field.type) if field.name in table.column_names
+               else pa.nulls(len(table), field.type) for field in schema]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+def dataset_schema(dataset_dir):
+    """Esquema de un archivo ya escrito del dataset (None si todavía no hay ninguno)."""
+    _, pq = _require_pyarrow()
+    first = next(Path(dataset_dir).rglob("*.parquet"), None) if Path(dataset_dir).exists() else None
+    return pq.read_schema(first) if first is not None else None
+
+def compact_parts(paths, part_dir, schema, row_group_size=DEFAULT_ROW_GROUP_SIZE,
+                  dictionary_fields=DICTIONARY_FIELDS, compression="zstd"):
+    """
+    Reescribe los Parquet intermedios `paths` de una partición como un único archivo en
+    `part_dir`, con el esquema `schema` y row groups de `row_group_size` filas. Lee un
+    archivo cada vez y acumula como mucho un row group. Devuelve la ruta final.
+    """
+    pa, pq = _require_pyarrow()
+    part_dir = Path(part_dir)
+    part_dir.mkdir(parents=True, exist_ok=True)
+    final = part_dir / part_filename(int(time.time() * 1000), uuid.uuid4().hex[:12], 0)
+    tmp = final.with_suffix(".parquet.tmp")
+    dictionary = [name for name in schema.names if name in set(dictionary_fields)]
+    pending, buffered = [], 0
+    with pq.ParquetWriter(tmp, schema, use_dictionary=dictionary, compression=compression) as writer:
+        for path in paths:
+            table = _conform(pq.read_table(path), schema)
+            pending.append(table)
+            buffered += len(table)
+            if buffered >= row_group_size:
+                merged = pa.concat_tables(pending)
+                full = buffered // row_group_size * row_group_size
+                writer.write_table(merged.slice(0, full), row_group_size=row_group_size)
+                pending, buffered = [merged.slice(full)], buffered - full
+        if buffered:
+            writer.write_table(pa.concat_tables(pending), row_group_size=row_group_size)
+    os.replace(tmp, final)
+    return final
+
+SINKS = {"jsonl": JsonlSink, "parquet": ParquetSink}
+
+def open_sink(fmt, out_dir, name, **kwargs):
+    """Crea el sink del formato pedido; `name` es el prefijo (JSONL) o el dataset (Parquet)."""
+    if fmt not in SINKS:
+        raise ValueError(f"Formato de salida desconocido: {fmt}")
+    return SINKS[fmt](out_dir, name, **kwargs)
+
+def dataset_name(path):
+    """noticias.jsonl -> noticias; stream_ws_BTCUSDT_trade_2024-05-01.jsonl -> stream_ws_BTCUSDT_trade."""
+    return re.sub(r"_\d{4}-\d{2}-\d{2}$", "", Path(path).stem)
+
+def main():
+    from .profiling import iter_jsonl
+
+    parser = argparse.ArgumentParser(description="Convierte archivos JSONL a Parquet particionado por fecha y fuente")
+    parser.add_argument("inputs", nargs="+", help="Archivos JSONL a convertir")
+    parser.add_argument("--out-dir", default="data/processed", help="Directorio raíz de los datasets Parquet")
+    parser.add_argument("--dataset", default=None, help="Nombre del dataset (por defecto, el del primer archivo sin fecha)")
+    parser.add_argument("--date-field", default=None, help=f"Campo de la partición por fecha (por defecto: {', '.join(DATE_FIELDS)})")
+    parser.add_argument("--source-field", default=None, help=f"Campo de la partición por fuente (por defecto: {', '.join(SOURCE_FIELDS)})")
+    parser.add_argument("--row-group-size", type=int, default=DEFAULT_ROW_GROUP_SIZE, help="Filas por row group")
+    args = parser.parse_args()
+
+    dataset = args.dataset or dataset_name(args.inputs[0])
+    started = time.perf_counter()
+    sink = ParquetSink(args.out_dir, dataset, args.date_field, args.source_field,
+                       row_group_size=args.row_group_size, flush_interval=float("inf"))
+    with sink:
+        for path in args.inputs:
+            for record in iter_jsonl(path):
+                sink.write(record)
+            print(f"✓ {path}")
+    elapsed = time.perf_counter() - started
+    size_in = sum(os.path.getsize(p) for p in args.inputs)
+    size_out = sum(f.stat().st_size for f in sink.path.rglob("*.parquet"))
+    print(f"[DONE] {sink.records} registros en {sink.path} ({sink.files} archivos, {elapsed:.1f}s)")
+    print(f"[STATS] JSONL {size_in / 1024 / 1024:.1f} MB -> Parquet {size_out / 1024 / 1024:.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+src/data/validation.py
+Validación de archivos JSONL contra el data contract (contracts/schema.yaml).
+
+El YAML se compila una sola vez en una lista de reglas: regex precompiladas,
+frozensets para `one_of`, longitudes, tipos, unicidad y las `quality_assertions`
+reconocibles. Después el JSONL se lee por bloques de pandas y cada regla se evalúa
+de forma vectorizada sobre el bloque, así que la memoria no depende del tamaño
+del archivo (salvo los valores ya vistos de las columnas `unique`).
+El resultado cuenta violaciones por regla y guarda algunas filas de ejemplo.
+
+Uso:
+  python -m src.data.validation data/raw/noticias.jsonl --contract contracts/schema.yaml
+"""
+import argparse
+import re
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import yaml
+
+DEFAULT_CONTRACT = "contracts/schema.yaml"
+DEFAULT_CHUNK_SIZE = 50_000
+SAMPLE_ROWS = 5
+
+ISO_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+ISO_DATETIME_RE = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?$")
+
+# Formas de `quality_assertions` que se saben traducir a una regla.
+ASSERT_UNIQUE_RE = re.compile(r"^COUNT\(DISTINCT (\w+)\)\s*=\s*COUNT\(\1\)$", re.I)
+ASSERT_REGEX_RE = re.compile(r"^(\w+) IS NULL OR REGEXP_MATCHES\(\1,\s*'(.*)'\)$", re.I)
+ASSERT_NOT_FUTURE_RE = re.compile(r"^(\w+) IS NULL OR \1 <= CURRENT_DATE$", re.I)
+
+def load_contract(path=DEFAULT_CONTRACT):
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+def _is_null(series):
+    return series.isna()
+
+def _strings(series):
+    """Valores no nulos convertidos a texto, para las comprobaciones `.str`."""
+    return series.astype("object").where(series.notna(), None).astype("string")
+
+class Rule:
+    """
+    Una comprobación compilada. `check(frame)` devuelve una máscara booleana con
+    las filas que la incumplen.
+    """
+    def __init__(self, name, column, check):
+        self.name = name
+        self.column = column
+        self.check = check
+        self.violations = 0
+        self.samples = []
+
+class UniqueRule(Rule):
+    """Unicidad entre bloques: recuerda los valores vistos en bloques anteriores."""
+    def __init__(self, name, column):
+        super().__init__(name, column, self._check)
+        self.seen = set()
+
+    def _check(self, frame):
+        # Un solo recorrido contra el set persistente: lineal en el total de filas. `isin(seen)`
+        # rehace la tabla hash de todo lo visto en cada bloque (cuadrático), y las variantes
+        # lineales (`map(seen.__contains__)`, diferencia de sets) miden más lentas que este bucle.
+        values = frame[self.column]
+        seen = self.seen
+        repeated = []
+        for value, present in zip(values.tolist(), values.notna().tolist()):
+            if not present:
+                repeated.append(False)
+            elif value in seen:
+                repeated.append(True)
+            else:
+                seen.add(value)
+                repeated.append(False)
+        return pd.Series(repeated, index=values.index, dtype=bool)
+
+def _column_rules(column):
+    name = column["name"]
+    constraints = column.get("constraints") or {}
+    nullable = column.get("nullable", not constraints.get("required", False))
+    rules = []
+
+    def rule(label, check):
+        rules.append(Rule(f"{name}.{label}", name, check))
+
+    if not nullable:
+        rule("required", lambda f: _is_null(f[name]) | (_strings(f[name]) == "").fillna(False))
+
+    col_type = column.get("type")
+    fmt = column.get("format")
+    if col_type == "string":
+        rule("type", lambda f: f[name].notna() & ~f[name].map(lambda v: isinstance(v, str)))
+    elif col_type == "date" or fmt == "YYYY-MM-DD":
+        rule("format", lambda f: f[name].notna() & ~_strings(f[name]).str.contains(ISO_DATE_RE).fillna(False))
+    elif col_type == "datetime" or fmt == "ISO8601":
+        rule("format", lambda f: f[name].notna() & ~_strings(f[name]).str.contains(ISO_DATETIME_RE).fillna(False))
+
+    if "pattern" in constraints:
+        pattern = re.compile(constraints["pattern"])
+        rule("pattern", lambda f: f[name].notna() & ~_strings(f[name]).str.contains(pattern).fillna(False))
+    if "min_length" in constraints:
+        min_length = constraints["min_length"]
+        rule("min_length", lambda f: (_strings(f[name]).str.len() < min_length).fillna(False))
+    if "max_length" in constraints:
+        max_length = constraints["max_length"]
+        rule("max_length", lambda f: (_strings(f[name]).str.len() > max_length).fillna(False))
+    if "one_of" in constraints:
+        allowed = frozenset(constraints["one_of"])
+        rule("one_of", lambda f: f[name].notna() & ~f[name].isin(allowed))
+    if constraints.get("unique"):
+        rules.append(UniqueRule(f"{name}.unique", name))
+    return rules
+
+def _assertion_rule(assertion):
+    """Traduce una `quality_assertion` a una regla; None si la expresión no es reconocida."""
+    name = assertion["check"]
+    expression = " ".join(str(assertion["expression"]).split())
+
+    match = ASSERT_UNIQUE_RE.match(expression)
+    if match:
+        return UniqueRule(name, match.group(1))
+    match = ASSERT_REGEX_RE.match(expression)
+    if match:
+        column, pattern = match.group(1), re.compile(match.group(2))
+        return Rule(name, column,
+                    lambda f: f[column].notna() & ~_strings(f[column]).str.contains(pattern).fillna(False))
+    match = ASSERT_NOT_FUTURE_RE.match(expression)
+    if match:
+        column = match.group(1)
+
+        def not_future(f):
+            parsed = pd.to_datetime(f[column], errors="coerce", utc=True, format="ISO8601")
+            # Timestamps contra timestamps: un bloque sin fechas válidas (todo NaT) también compara.
+            today = pd.Timestamp(date.today(), tz="UTC")
+            return (parsed.dt.normalize() > today).fillna(False).astype(bool)
+        return Rule(name, column, not_future)
+    return None
+
+class ContractValidator:
+    def __init__(self, contract):
+        if isinstance(contract, (str, Path)):
+            contract = load_contract(contract)
+        self.contract = contract
+        self.rules = []
+        for column in contract.get("dataset", {}).get("columns", []):
+            self.rules.extend(_column_rules(column))
+        self.unsupported = []
+        for assertion in contract.get("quality_assertions", []) or []:
+            rule = _assertion_rule(assertion)
+            if rule is None:
+                self.unsupported.append(assertion["check"])
+            else:
+                self.rules.append(rule)
+        self.columns = [c["name"] for c in contract.get("dataset", {}).get("columns", [])]
+        self.total = 0
+
+    def validate_frame(self, frame):
+        """Aplica todas las reglas a un bloque (DataFrame) y acumula los resultados."""
+        # Las columnas ausentes cuentan como nulas, igual que una clave que falta en el registro.
+        for column in self.columns:
+            if column not in frame.columns:
+                frame[column] = None
+        frame.index = range(self.total, self.total + len(frame))
+        for rule in self.rules:
+            mask = rule.check(frame).astype(bool)
+            count = int(mask.sum())
+            if count:
+                rule.violations += count
+                if len(rule.samples) < SAMPLE_ROWS:
+                    offending = frame.loc[mask, [rule.column]].head(SAMPLE_ROWS - len(rule.samples))
+                    rule.samples.extend(
+                        {"row": int(i), rule.column: None if pd.isna(v) else getattr(v, "item", lambda: v)()}
+                        for i, v in offending[rule.column].items()
+                    )
+        self.total += len(frame)
+
+    def validate_jsonl(self, path, chunk_size=DEFAULT_CHUNK_SIZE):
+        reader = pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False, convert_dates=False)
+        with reader:
+            for chunk in reader:
+                self.validate_frame(chunk)
+        return self.result()
+
+    def result(self):
+        return {
+            "contract": self.contract.get("contract_name"),
+            "total": self.total,
+            "rules": {
+                rule.name: {"violations": rule.violations, "samples": rule.samples}
+                for rule in self.rules
+            },
+            "unsupported": self.unsupported,
+            "ok": all(rule.violations == 0 for rule in self.rules),
+        }
+
+def validate_jsonl(path, contract=DEFAULT_CONTRACT, chunk_size=DEFAULT_CHUNK_SIZE):
+    return ContractValidator(contract).validate_jsonl(path, chunk_size)
+
+def render_validation_md(result):
+    lines = [
+        f"# Validación del contrato `{result['contract']}`\n",
+        f"- **Registros validados**: {result['total']}",
+        f"- **Resultado**: {'✓ sin violaciones' if result['ok'] else '✗ con violaciones'}\n",
+        "| Regla | Violaciones |",
+        "|-------|-------------|",
+    ]
+    for name, info in result["rules"].items():
+        lines.append(f"| {name} | {info['violations']} |")
+    for name, info in result["rules"].items():
+        if info["samples"]:
+            lines.append(f"\n### {name}\n")
+            lines.extend(f"- {sample}" for sample in info["samples"])
+    if result["unsupported"]:
+        lines.append("\n**Aserciones no soportadas:** " + ", ".join(result["unsupported"]))
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description="Valida un archivo JSONL contra el data contract")
+    parser.add_argument("input", help="Archivo JSONL a validar")
+    parser.add_argument("--contract", default=DEFAULT_CONTRACT, help="Ruta del contrato YAML")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Registros por bloque")
+    parser.add_argument("--output", default=None, help="Reporte Markdown opcional")
+    args = parser.parse_args()
+
+    result = validate_jsonl(args.input, args.contract, args.chunk_size)
+    for name, info in result["rules"].items():
+        mark = "✓" if info["violations"] == 0 else "✗"
+        print(f"{mark} {name}: {info['violations']}")
+    if args.output:
+        out = Path(args.output)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(render_validation_md(result), encoding="utf-8")
+        print(f"[DONE] Reporte de validación en {out}")
+    raise SystemExit(0 if result["ok"] else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+src/dates.py
+Normalización de fechas de los artículos a UTC, compartida por src/main.py y src/scraper.py.
+
+Orden de intento, de más barato a más caro:
+  1. ISO-8601 estricto (`datetime.fromisoformat`), filtrado por una regex precompilada.
+  2. RFC 2822 (`Wed, 01 Oct 2025 12:40:00 GMT`), habitual en feeds y cabeceras.
+  3. Formatos conocidos de cada fuente (`strptime`), cada uno con su regex.
+  4. `dateutil.parser.parse` como último recurso.
+Los resultados se guardan en una caché LRU acotada (los listados repiten las
+mismas marcas de tiempo) y `stats()` informa de aciertos y de cuántas veces se
+llegó a dateutil, para saber qué formatos conviene añadir; el tiempo gastado en
+dateutil va al histograma `dates_dateutil_seconds` (src/metrics.py).
+Las fechas sin zona horaria se interpretan como UTC.
+"""
+import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+
+from dateutil import parser as dateparser
+
+from metrics import REGISTRY
+
+ISO_RE = re.compile(r"^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?(Z|[+-]\d{2}:?\d{2})?$")
+RFC2822_RE = re.compile(r"^(\w{3}, )?\d{1,2} \w{3} \d{4} \d{2}:\d{2}(:\d{2})? ")
+DEFAULT_CACHE_SIZE = 4096
+DATEUTIL_SECONDS = REGISTRY.histogram("dates_dateutil_seconds", "Duración de dateutil.parser.parse (último recurso)")
+
+def _format_regex(fmt):
+    """Regex aproximada para un formato strptime, usada para descartar sin lanzar excepciones."""
+    parts = {"%d": r"\d{1,2}", "%m": r"\d{1,2}", "%Y": r"\d{4}", "%H": r"\d{1,2}", "%M": r"\d{2}",
+             "%S": r"\d{2}", "%B": r"[A-Za-z]+", "%b": r"[A-Za-z]{3}\.?", "%p": r"[AaPp][Mm]", "%I": r"\d{1,2}",
+             "%z": r"[+-]\d{4}", "%Z": r"[A-Z]{2,5}"}
+    pattern = re.escape(fmt)
+    for directive, regex in parts.items():
+        pattern = pattern.replace(re.escape(directive), regex)
+    return re.compile("^" + pattern + "$")
+
+class DateNormalizer:
+    def __init__(self, formats=(), cache_size=DEFAULT_CACHE_SIZE):
+        self.formats = [(fmt, _format_regex(fmt)) for fmt in formats]
+        self.counts = {"iso": 0, "rfc2822": 0, "format": 0, "fallback": 0, "failed": 0}
+        self._cached = lru_cache(maxsize=cache_size)(self._parse)
+
+    def to_utc(self, raw):
+        """Fecha `raw` como datetime en UTC, o None si no se puede interpretar."""
+        if not raw:
+            return None
+        return self._cached(raw.strip())
+
+    def to_iso(self, raw):
+        """Fecha `raw` en ISO-8601 UTC con sufijo `Z`, o None."""
+        dt = self.to_utc(raw)
+        return dt.isoformat().replace("+00:00", "Z") if dt else None
+
+    def _parse(self, raw):
+        dt = None
+        if ISO_RE.match(raw):
+            try:
+                dt = datetime.fromisoformat(raw)
+                self.counts["iso"] += 1
+            except ValueError:
+                dt = None
+        if dt is None and RFC2822_RE.match(raw):
+            try:
+                dt = parsedate_to_datetime(raw)
+                self.counts["rfc2822"] += 1
+            except (TypeError, ValueError):
+                dt = None
+        if dt is None:
+            for fmt, regex in self.formats:
+                if regex.match(raw):
+                    try:
+                        dt = datetime.strptime(raw, fmt)
+                        self.counts["format"] += 1
+                        break
+                    except ValueError:
+                        continue
+        if dt is None:
+            try:
+                with DATEUTIL_SECONDS.time():
+                    dt = dateparser.parse(raw)
+                self.counts["fallback"] += 1
+            except (ValueError, OverflowError, TypeError):
+                self.counts["failed"] += 1
+                return None
+        if not dt.tzinfo:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.astimezone(timezone.utc)
+
+    def stats(self):
+        info = self._cached.cache_info()
+        calls = info.hits + info.misses
+        return {
+            "calls": calls,
+            "cache_hit_rate": round(info.hits / calls, 3) if calls else 0.0,
+            "fallback_rate": round(self.counts["fallback"] / info.misses, 3) if info.misses else 0.0,
+            **self.counts,
+        }
+
+_normalizers = {}
+
+def get_normalizer(key=None, formats=()):
+    """Normalizador compartido por proceso para una fuente (se crea en el primer uso)."""
+    normalizer = _normalizers.get(key)
+    if normalizer is None:
+        normalizer = _normalizers[key] = DateNormalizer(formats)
+    return normalizer
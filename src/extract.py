@@ -0,0 +1,139 @@
+"""
+src/extract.py
+Extracción de campos de un artículo (título, resumen, autor, fecha) a partir del HTML.
+
+- `extract_fields`: ruta rápida con el pull parser de lxml. Alimenta el HTML por
+  bloques y deja de leer en cuanto todos los campos quedan resueltos, sin
+  construir un árbol BeautifulSoup.
+- `extract_fields_soup`: la ruta original con BeautifulSoup, de referencia
+  (benchmarks/bench_extract.py compara ambas).
+
+Ambas siguen las mismas reglas: primero las <meta> en el orden de prioridad de
+cada campo y, si no hay ninguna, el <h1>, el primer elemento con clase "author"
+o el primer <time>. Diferencia: la ruta rápida sólo lee las <meta> del <head>.
+"""
+import re
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+TITLE_META = [{"property": "og:title"}, {"name": "twitter:title"}, {"name": "title"}]
+SNIPPET_META = [{"property": "og:description"}, {"name": "description"}, {"name": "twitter:description"}]
+AUTHOR_META = [{"name": "author"}, {"property": "article:author"}]
+DATE_META = [{"property": "article:published_time"}, {"name": "pubdate"}, {"name": "date"}, {"property": "og:updated_time"}]
+
+AUTHOR_CLASS = re.compile("author", re.I)
+CHUNK_SIZE = 16 * 1024
+
+# 🔹 Corrección aquí: usamos attrs=attrs en lugar de **attrs
+def extract_meta(soup, attrs_list):
+    for attrs in attrs_list:
+        tag = soup.find("meta", attrs=attrs)
+        if tag and tag.get("content"):
+            return tag.get("content")
+    return None
+
+def extract_fields_soup(html):
+    """Ruta original: árbol BeautifulSoup completo."""
+    soup = BeautifulSoup(html, "lxml")
+
+    title = extract_meta(soup, TITLE_META)
+    if not title:
+        h1 = soup.find("h1")
+        title = h1.get_text(strip=True) if h1 else None
+
+    snippet = extract_meta(soup, SNIPPET_META)
+    author = extract_meta(soup, AUTHOR_META)
+    if not author:
+        auth_el = soup.find(class_=AUTHOR_CLASS)
+        if auth_el:
+            author = auth_el.get_text(" ", strip=True)
+
+    date_str = extract_meta(soup, DATE_META)
+    if not date_str:
+        time_tag = soup.find("time")
+        if time_tag and time_tag.has_attr("datetime"):
+            date_str = time_tag["datetime"]
+        elif time_tag:
+            date_str = time_tag.get_text(strip=True)
+
+    return {"title": title, "snippet": snippet, "author": author, "date_str": date_str}
+
+def _pick_meta(metas, attrs_list):
+    """Equivalente a `extract_meta` sobre las <meta> recogidas (primera aparición de cada clave)."""
+    for attrs in attrs_list:
+        content = metas.get(next(iter(attrs.items())))
+        if content:
+            return content
+    return None
+
+def _stripped_text(el, sep):
+    return sep.join(s.strip() for s in el.itertext() if s.strip())
+
+def extract_fields(content, encoding=None):
+    """
+    Ruta rápida. `content` puede ser bytes (con `encoding` opcional) o str.
+    Devuelve el mismo diccionario que `extract_fields_soup`.
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+        encoding = "utf-8"
+    parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding)
+
+    metas = {}
+    found = {"head_done": False, "h1": None, "author": None, "time": None}
+    texts = {"h1": None, "author": None, "time": None}
+
+    def consume():
+        for event, el in parser.read_events():
+            tag = el.tag
+            if event == "start":
+                if tag == "meta" and not found["head_done"]:
+                    for attr in ("property", "name"):
+                        value = el.get(attr)
+                        if value is not None:
+                            metas.setdefault((attr, value), el.get("content"))
+                elif tag == "h1" and found["h1"] is None:
+                    found["h1"] = el
+                elif tag == "time" and found["time"] is None:
+                    found["time"] = el
+                    texts["time"] = el.get("datetime")
+                if found["author"] is None and AUTHOR_CLASS.search(el.get("class") or ""):
+                    found["author"] = el
+            else:
+                if tag == "head":
+                    found["head_done"] = True
+                if el is found["h1"]:
+                    texts["h1"] = _stripped_text(el, "")
+                if el is found["time"] and texts["time"] is None:
+                    texts["time"] = _stripped_text(el, "")
+                if el is found["author"]:
+                    texts["author"] = _stripped_text(el, " ")
+
+    for offset in range(0, len(content), CHUNK_SIZE):
+        parser.feed(content[offset:offset + CHUNK_SIZE])
+        consume()
+        # Las <meta> ya están completas al cerrar el <head>; a partir de ahí basta
+        # con que cada campo tenga su <meta> o su respaldo en el cuerpo.
+        if (found["head_done"]
+                and (_pick_meta(metas, TITLE_META) or texts["h1"] is not None)
+                and (_pick_meta(metas, AUTHOR_META) or texts["author"] is not None)
+                and (_pick_meta(metas, DATE_META) or texts["time"] is not None)):
+            break
+    else:
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            pass  # documento vacío o sin elementos
+        consume()
+
+    h1_text, author_text, time_text = texts["h1"], texts["author"], texts["time"]
+    title = _pick_meta(metas, TITLE_META) or h1_text
+    author = _pick_meta(metas, AUTHOR_META) or author_text
+    date_str = _pick_meta(metas, DATE_META) or time_text
+    return {
+        "title": title,
+        "snippet": _pick_meta(metas, SNIPPET_META),
+        "author": author,
+        "date_str": date_str,
+    }
@@ -0,0 +1,201 @@
+"""
+src/fetcher.py
+Capa HTTP compartida por los scrapers (src/main.py y src/scraper.py).
+
+- Un token bucket por dominio: cada sitio se consulta a su ritmo permitido en
+  lugar de dormir un tiempo fijo entre peticiones.
+- Un pool keep-alive dimensionado por host (requests + urllib3).
+- Respeta `Retry-After` en respuestas 429/503.
+- Caché condicional opcional (ETag / Last-Modified, ver src/http_cache.py).
+- Contadores de peticiones/s, espera en el limitador y reutilización del pool.
+- Métricas por host en src/metrics.py: espera en el limitador, tiempo hasta las
+  cabeceras (incluye DNS/conexión si no se reutiliza) y descarga del cuerpo.
+"""
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import REGISTRY
+
+DEFAULT_RATE = 1.0          # peticiones por segundo para dominios sin configurar
+DEFAULT_POOL_MAXSIZE = 4    # conexiones keep-alive por host
+RETRY_STATUSES = (429, 503)
+
+class TokenBucket:
+    """Token bucket bloqueante y seguro entre hilos."""
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Espera hasta disponer de un token. Devuelve los segundos esperados."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """Bloquea el bucket (p. ej. por un `Retry-After`) durante `seconds`."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+def parse_retry_after(value):
+    """Interpreta `Retry-After` en segundos o como fecha HTTP. None si no es válido."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+class Fetcher:
+    """
+    Cliente HTTP con limitación por dominio. `rates` mapea dominio -> peticiones/s;
+    un host coincide con un dominio si es igual o es un subdominio suyo.
+    """
+    def __init__(self, rates=None, default_rate=DEFAULT_RATE, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 headers=None, max_retries=2, cache=None):
+        self.rates = dict(rates or {})
+        self.cache = cache
+        self.default_rate = default_rate
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        self.adapter = HTTPAdapter(pool_connections=max(len(self.rates), 1), pool_maxsize=pool_maxsize)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+        self._buckets = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.requests = 0
+        self.retries = 0
+        self.limiter_wait = 0.0
+
+    def _bucket_for(self, url):
+        host = urlparse(url).hostname or ""
+        key, rate = host, self.default_rate
+        for domain, domain_rate in self.rates.items():
+            if host == domain or host.endswith("." + domain):
+                key, rate = domain, domain_rate
+                break
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate)
+            return bucket
+
+    def _metrics_for(self, host):
+        metrics = self._metrics.get(host)
+        if metrics is None:
+            metrics = self._metrics[host] = (
+                REGISTRY.histogram("http_limiter_wait_seconds", "Espera en el token bucket del dominio", host=host),
+                REGISTRY.histogram("http_response_seconds", "Duración de session.get por fase", host=host, phase="headers"),
+                REGISTRY.histogram("http_response_seconds", "Duración de session.get por fase", host=host, phase="body"),
+            )
+        return metrics
+
+    def get(self, url, **kwargs):
+        """
+        Igual que `requests.Session.get`, pero pasando por el limitador del dominio.
+        Con caché, un 304 se devuelve como 200 con el cuerpo guardado y
+        `response.from_cache = True`.
+        """
+        response = None
+        conditional = self.cache.conditional_headers(url) if self.cache is not None else {}
+        if conditional:
+            headers = dict(kwargs.get("headers") or {}, **conditional)
+            response = self._request(url, dict(kwargs, headers=headers))
+            if response.status_code == 304:
+                cached = self.cache.load(url)
+                if cached is not None:
+                    response._content, response.encoding = cached
+                    response.status_code = 200
+                    response.from_cache = True
+                    return response
+                # La entrada desapareció entre tanto: se repite sin cabeceras condicionales.
+                response = None
+        if response is None:
+            response = self._request(url, kwargs)
+        response.from_cache = False
+        if self.cache is not None:
+            self.cache.store(url, response)
+        return response
+
+    def _request(self, url, kwargs):
+        bucket = self._bucket_for(url)
+        wait_seconds, headers_seconds, body_seconds = self._metrics_for(urlparse(url).hostname or "")
+        for attempt in range(self.max_retries + 1):
+            waited = bucket.acquire()
+            started = time.perf_counter()
+            response = self.session.get(url, **kwargs)
+            # `elapsed` llega hasta las cabeceras; el resto de session.get es el cuerpo.
+            total = time.perf_counter() - started
+            headers = min(response.elapsed.total_seconds(), total)
+            wait_seconds.observe(waited)
+            headers_seconds.observe(headers)
+            body_seconds.observe(total - headers)
+            with self._lock:
+                self.requests += 1
+                self.limiter_wait += waited
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is None:
+                return response
+            bucket.pause(retry_after)
+            with self._lock:
+                self.retries += 1
+        return response
+
+    def pool_reuse_rate(self):
+        """Fracción de peticiones que reutilizaron una conexión keep-alive."""
+        pools = self.adapter.poolmanager.pools
+        num_requests = num_connections = 0
+        for key in pools.keys():
+            pool = pools[key]
+            num_requests += pool.num_requests
+            num_connections += pool.num_connections
+        return (1 - num_connections / num_requests) if num_requests else 0.0
+
+    def stats(self):
+        elapsed = time.monotonic() - self._started
+        return {
+            "requests": self.requests,
+            "requests_per_sec": round(self.requests / elapsed, 3) if elapsed else 0.0,
+            "limiter_wait_s": round(self.limiter_wait, 3),
+            "retry_after_hits": self.retries,
+            "pool_reuse_rate": round(self.pool_reuse_rate(), 3),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.save()
+        self.session.close()
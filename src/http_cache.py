@@ -0,0 +1,119 @@
+"""
+src/http_cache.py
+Caché en disco de respuestas HTTP con peticiones condicionales (ETag / Last-Modified).
+
+Cada URL guarda su cuerpo en `<cache_dir>/<sha1>.body` y sus metadatos en
+`index.json`. Si el servidor responde 304, `Fetcher` reconstruye la respuesta
+con el cuerpo guardado, y el llamador puede reutilizar además el resultado ya
+parseado (`get_parsed`) sin volver a pasar por BeautifulSoup.
+El tamaño total se acota con desalojo LRU.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = "data/cache/http"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+class ResponseCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.index_path = self.dir / "index.json"
+        self._lock = threading.Lock()
+        self.entries = {}
+        if self.index_path.exists():
+            try:
+                self.entries = json.loads(self.index_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _body_path(self, url):
+        return self.dir / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".body")
+
+    def conditional_headers(self, url):
+        """Cabeceras `If-None-Match` / `If-Modified-Since` para la URL, si hay entrada."""
+        entry = self.entries.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def load(self, url):
+        """Devuelve (cuerpo en bytes, encoding) de una entrada validada por un 304."""
+        with self._lock:
+            entry = self.entries.get(url)
+            if not entry:
+                return None
+            try:
+                body = self._body_path(url).read_bytes()
+            except OSError:
+                self.entries.pop(url, None)
+                return None
+            entry["atime"] = time.time()
+            self.hits += 1
+            return body, entry.get("encoding")
+
+    def store(self, url, response):
+        """Guarda una respuesta 200 que traiga ETag o Last-Modified."""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            return
+        body = response.content
+        with self._lock:
+            self.misses += 1
+            self._body_path(url).write_bytes(body)
+            self.entries[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "encoding": response.encoding,
+                "size": len(body),
+                "atime": time.time(),
+            }
+            self._evict()
+
+    def get_parsed(self, url):
+        entry = self.entries.get(url)
+        return entry.get("parsed") if entry else None
+
+    def put_parsed(self, url, value):
+        """Asocia a la URL el resultado de parsear su cuerpo (debe ser serializable a JSON)."""
+        with self._lock:
+            entry = self.entries.get(url)
+            if entry is not None:
+                entry["parsed"] = value
+
+    def _evict(self):
+        total = sum(e["size"] for e in self.entries.values())
+        if total <= self.max_bytes:
+            return
+        for url, entry in sorted(self.entries.items(), key=lambda kv: kv[1]["atime"]):
+            if total <= self.max_bytes:
+                break
+            total -= entry["size"]
+            del self.entries[url]
+            try:
+                self._body_path(url).unlink()
+            except OSError:
+                pass
+
+    def save(self):
+        """Persiste el índice de forma atómica."""
+        with self._lock:
+            tmp = self.index_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.entries, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.index_path)
+
+    def stats(self):
+        return {"entries": len(self.entries), "not_modified": self.hits, "stored": self.misses}
@@ -6,22 +6,32 @@ Guarda JSON Lines en data/raw/noticias.jsonl y genera un perfil en reports/perfi
 
 Uso:
   python src/main.py --source reuters --limit 20 --output data/raw/noticias.jsonl
+  python src/main.py --source reuters bbc --limit 500 --concurrency 8 --parse-workers 4
+  python src/main.py --source reuters --metrics-port 9108 --metrics-snapshot reports/metrics.json
+  python src/main.py --source reuters --profile-cpu            # perfil en reports/profiles
 """
 import argparse
+import asyncio
 import os
 import re
-import time
 import json
-import hashlib
-import random
-from datetime import datetime, timezone
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from urllib.parse import urljoin, urlparse
 
-import requests
 from bs4 import BeautifulSoup
-from dateutil import parser as dateparser
 from tqdm import tqdm
-import validators
+from data.profiling import StreamingProfiler, profile_jsonl, render_profile_md
+from data.sinks import ParquetSink
+from data.validation import DEFAULT_CONTRACT, validate_jsonl
+from dates import get_normalizer
+from extract import extract_fields
+from fetcher import Fetcher
+from http_cache import DEFAULT_CACHE_DIR, ResponseCache
+from metrics import REGISTRY, start_exporters
+from profiler import FORMATS, ProfileSession, install_signal_handler, start_from_env
+from seen_index import SeenIndex, url_digest
 
 DEFAULT_OUTPUT = "data/raw/noticias.jsonl"
 
@@ -29,20 +39,34 @@ SOURCES = {
     "eluniversal": {
         "name": "El Universal",
         "listing": "https://www.eluniversal.com.mx/ultimas-noticias",
-        "domain": "eluniversal.com.mx"
+        "domain": "eluniversal.com.mx",
+        "rate": 1.0,
+        "date_formats": ["%d/%m/%Y %H:%M", "%d/%m/%Y"]
     },
     "bbc": {
         "name": "BBC Mundo",
         "listing": "https://www.bbc.com/mundo",
-        "domain": "bbc.com"
+        "domain": "bbc.com",
+        "rate": 1.0,
+        "date_formats": []
     },
     "reuters": {
         "name": "Reuters",
         "listing": "https://www.reuters.com/world/",
-        "domain": "reuters.com"
+        "domain": "reuters.com",
+        "rate": 1.0,
+        "date_formats": ["%B %d, %Y %I:%M %p", "%B %d, %Y"]
     },
 }
 
+# Duración por etapa (src/metrics.py). Con --parse-workers, parse y dates se miden en los hijos.
+STAGE_HELP = "Duración de cada etapa del scraper"
+DISCOVER_SECONDS = REGISTRY.histogram("scraper_stage_seconds", STAGE_HELP, stage="discover_parse")
+PARSE_SECONDS = REGISTRY.histogram("scraper_stage_seconds", STAGE_HELP, stage="parse")
+DATES_SECONDS = REGISTRY.histogram("scraper_stage_seconds", STAGE_HELP, stage="dates")
+SAVE_SECONDS = REGISTRY.histogram("scraper_stage_seconds", STAGE_HELP, stage="save_jsonl")
+RECORDS_WRITTEN = REGISTRY.counter("scraper_records_written_total", "Registros escritos en el JSONL")
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; noticias-scraper/1.0; +https://example.com/bot)"
 }
@@ -52,11 +76,22 @@ def ensure_dirs(path):
     if d:
         os.makedirs(d, exist_ok=True)
 
-def discover_links(session, listing_url, domain, limit=200):
-    r = session.get(listing_url, headers=HEADERS, timeout=15)
+def discover_links(fetcher, listing_url, domain, limit=200, exclude=None):
+    """
+    Enlaces a artículos del listado, en orden de aparición. `exclude` (p. ej. un
+    SeenIndex) descarta URLs ya capturadas sin que cuenten para `limit`.
+    """
+    r = fetcher.get(listing_url, headers=HEADERS, timeout=15)
     r.raise_for_status()
-    soup = BeautifulSoup(r.text, "lxml")
+    # Listado sin cambios (304): se reutilizan los enlaces ya extraídos. La caché guarda
+    # todos los enlaces del listado; `exclude` y `limit` se aplican en cada llamada.
+    cached = fetcher.cache.get_parsed(listing_url) if r.from_cache else None
+    if cached and "all_links" in cached:
+        return _select_links(cached["all_links"], limit, exclude)
+    with DISCOVER_SECONDS.time():
+        soup = BeautifulSoup(r.text, "lxml")
     links = []
+    seen = set()
     for a in soup.find_all("a", href=True):
         href = a['href']
         if href.startswith("//"):
@@ -65,142 +100,268 @@ def discover_links(session, listing_url, domain, limit=200):
             href = urljoin(listing_url, href)
         parsed = urlparse(href)
         if domain in parsed.netloc:
-            if href not in links and not re.search(r'/videos?/|/audio/|/live/', href):
+            if href not in seen and not re.search(r'/videos?/|/audio/|/live/', href):
+                seen.add(href)
                 links.append(href)
-        if len(links) >= limit:
-            break
-    return links
-
-# 🔹 Corrección aquí: usamos attrs=attrs en lugar de **attrs
-def extract_meta(soup, attrs_list):
-    for attrs in attrs_list:
-        tag = soup.find("meta", attrs=attrs)
-        if tag and tag.get("content"):
-            return tag.get("content")
-    return None
-
-def parse_article(session, url, source_key):
+    if fetcher.cache is not None:
+        fetcher.cache.put_parsed(listing_url, {"all_links": links})
+    return _select_links(links, limit, exclude)
+
+def _select_links(links, limit, exclude=None):
+    """Primero descarta los enlaces de `exclude` y después corta a `limit`."""
+    if exclude is not None:
+        links = [href for href in links if href not in exclude]
+    return links[:limit]
+
+def capture_ts():
+    return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+def fetch_article(fetcher, url):
+    """Descarga un artículo; devuelve la respuesta o None si falla."""
     try:
-        r = session.get(url, headers=HEADERS, timeout=15)
+        r = fetcher.get(url, headers=HEADERS, timeout=15)
         r.raise_for_status()
     except Exception as e:
         print(f"[WARN] no se pudo obtener {url}: {e}")
         return None
+    return r
 
-    soup = BeautifulSoup(r.text, "lxml")
-
-    title = extract_meta(soup, [{"property":"og:title"}, {"name":"twitter:title"}, {"name":"title"}])
-    if not title:
-        h1 = soup.find("h1")
-        title = h1.get_text(strip=True) if h1 else None
-
-    snippet = extract_meta(soup, [{"property":"og:description"}, {"name":"description"}, {"name":"twitter:description"}])
-    author = extract_meta(soup, [{"name":"author"}, {"property":"article:author"}])
-    if not author:
-        auth_el = soup.find(class_=re.compile("author", re.I))
-        if auth_el:
-            author = auth_el.get_text(" ", strip=True)
-
-    date_str = extract_meta(soup, [{"property":"article:published_time"}, {"name":"pubdate"}, {"name":"date"}, {"property":"og:updated_time"}])
-    if not date_str:
-        time_tag = soup.find("time")
-        if time_tag and time_tag.has_attr("datetime"):
-            date_str = time_tag["datetime"]
-        elif time_tag:
-            date_str = time_tag.get_text(strip=True)
-
-    fecha_iso = None
-    try:
-        if date_str:
-            dt = dateparser.parse(date_str)
-            if not dt.tzinfo:
-                dt = dt.replace(tzinfo=timezone.utc)
-            fecha_iso = dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
-    except Exception:
-        fecha_iso = None
+def build_record(url, source_key, content, encoding, capturado_ts):
+    """
+    Parte CPU del scraping: HTML crudo -> registro. Es una función de módulo sin
+    estado para poder ejecutarse en un ProcessPoolExecutor.
+    """
+    with PARSE_SECONDS.time():
+        fields = extract_fields(content, encoding)
+    dates = get_normalizer(source_key, SOURCES[source_key]["date_formats"])
+    with DATES_SECONDS.time():
+        fecha_iso = dates.to_iso(fields["date_str"])
 
-    h = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
-    id_ = f"{source_key}-{h}"
+    id_ = f"{source_key}-{url_digest(url)}"
 
     record = {
         "id": id_,
-        "titulo": title,
+        "titulo": fields["title"],
         "fecha": fecha_iso,
         "url": url,
         "fuente": SOURCES[source_key]["name"],
-        "autor": author,
-        "capturado_ts": datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
-        "snippet": snippet
+        "autor": fields["author"],
+        "capturado_ts": capturado_ts,
+        "snippet": fields["snippet"]
     }
     return record
 
-def save_jsonl(records, path):
+def parse_article(fetcher, url, source_key):
+    r = fetch_article(fetcher, url)
+    if r is None:
+        return None
+
+    # Artículo sin cambios (304): se evita también el parseo.
+    cached = fetcher.cache.get_parsed(url) if r.from_cache else None
+    if cached:
+        return dict(cached, capturado_ts=capture_ts())
+
+    record = build_record(url, source_key, r.content, r.encoding, capture_ts())
+    if fetcher.cache is not None:
+        fetcher.cache.put_parsed(url, record)
+    return record
+
+def scrape_serial(fetcher, jobs, limit):
+    """Descarga los artículos uno a uno; el ritmo lo marca el limitador de `fetcher`."""
+    records = []
+    found = defaultdict(int)
+    for source_key, url in tqdm(jobs, desc="scraping"):
+        if found[source_key] >= limit:
+            continue
+        rec = parse_article(fetcher, url, source_key)
+        if rec:
+            records.append(rec)
+            found[source_key] += 1
+    return records
+
+async def scrape_concurrent(fetcher, jobs, limit, concurrency, parse_workers=0, queue_size=None):
+    """
+    Pipeline de dos etapas. Hasta `concurrency` descargas en vuelo (hilos) dejan el
+    HTML crudo en una cola acotada, y `parse_workers` procesos lo convierten en
+    registros (0 = parseo en el pool de hilos del event loop). Si el parseo va por
+    detrás, la cola llena detiene las descargas, así que en memoria nunca hay más
+    de `concurrency + queue_size` páginas.
+
+    La cortesía por host la aplica el token bucket de `fetcher` (por dominio).
+    `jobs` es una lista de (source_key, url); el resultado conserva el orden de
+    `jobs` y se recorta a `limit` registros por fuente, igual que el modo serial.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+    queue = asyncio.Queue(maxsize=queue_size or 2 * max(parse_workers, 1))
+    semaphore = asyncio.Semaphore(concurrency)
+    results = [None] * len(jobs)
+    found = defaultdict(int)
+    progress = tqdm(total=len(jobs), desc="scraping")
+
+    def accept(i, source_key, rec):
+        if rec:
+            results[i] = rec
+            found[source_key] += 1
+        progress.update(1)
+
+    async def fetch(i, source_key, url):
+        async with semaphore:
+            # El semáforo despierta a las tareas en orden, así que las que se saltan
+            # aquí siempre van detrás de las que completaron el cupo.
+            if found[source_key] >= limit:
+                progress.update(1)
+                return
+            r = await asyncio.to_thread(fetch_article, fetcher, url)
+            if r is None:
+                accept(i, source_key, None)
+                return
+            cached = fetcher.cache.get_parsed(url) if r.from_cache else None
+            if cached:
+                accept(i, source_key, dict(cached, capturado_ts=capture_ts()))
+                return
+            await queue.put((i, source_key, url, r.content, r.encoding, capture_ts()))
+
+    async def parse():
+        while True:
+            i, source_key, url, content, encoding, ts = await queue.get()
+            try:
+                rec = await loop.run_in_executor(executor, build_record, url, source_key, content, encoding, ts)
+            except Exception as e:
+                print(f"[WARN] no se pudo parsear {url}: {e}")
+                rec = None
+            if rec and fetcher.cache is not None:
+                fetcher.cache.put_parsed(url, rec)
+            accept(i, source_key, rec)
+            queue.task_done()
+
+    parsers = [asyncio.create_task(parse()) for _ in range(max(parse_workers, 1))]
+    try:
+        await asyncio.gather(*(fetch(i, source_key, url) for i, (source_key, url) in enumerate(jobs)))
+        await queue.join()
+    finally:
+        for task in parsers:
+            task.cancel()
+        if executor is not None:
+            executor.shutdown()
+        progress.close()
+
+    records = []
+    kept = defaultdict(int)
+    for (source_key, _), rec in zip(jobs, results):
+        if rec and kept[source_key] < limit:
+            records.append(rec)
+            kept[source_key] += 1
+    return records
+
+def save_jsonl(records, path, append=False):
     ensure_dirs(path)
-    with open(path, "w", encoding="utf-8") as f:
+    with SAVE_SECONDS.time(), open(path, "a" if append else "w", encoding="utf-8") as f:
         for r in records:
             f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    RECORDS_WRITTEN.inc(len(records))
 
-def profile(records):
-    fields = ["id","titulo","fecha","url","fuente","autor","capturado_ts"]
-    total = len(records)
-    nulls = {field: sum(1 for r in records if not r.get(field)) for field in fields}
-    dup_urls = total - len({r.get("url") for r in records})
-    dup_ids = total - len({r.get("id") for r in records})
-    valid_dates = sum(1 for r in records if r.get("fecha"))
-    valid_urls = sum(1 for r in records if validators.url(r.get("url","")))
-    return {
-        "total": total,
-        "nulls": {k: {"count":v, "pct": (v/total*100) if total else 0} for k,v in nulls.items()},
-        "duplicates": {"by_url": dup_urls, "by_id": dup_ids},
-        "valid_dates": {"count": valid_dates, "pct": (valid_dates/total*100) if total else 0},
-        "valid_urls": {"count": valid_urls, "pct": (valid_urls/total*100) if total else 0}
-    }
+def profile(records, approx=False):
+    return StreamingProfiler("main", approx=approx).consume(records).result()
 
 def write_profile_md(stats, out_md):
     ensure_dirs(out_md)
     with open(out_md, "w", encoding="utf-8") as f:
-        f.write("# Perfilado de Calidad\n\n")
-        f.write(f"- **Total de registros**: {stats['total']}\n")
-        f.write(f"- **Duplicados por URL**: {stats['duplicates']['by_url']}\n")
-        f.write(f"- **Duplicados por id**: {stats['duplicates']['by_id']}\n\n")
-        f.write("## Valores nulos por campo\n\n")
-        for field, info in stats["nulls"].items():
-            f.write(f"- {field}: {info['count']} ({info['pct']:.2f}%)\n")
-        f.write("\n")
-        f.write(f"- **Fechas válidas**: {stats['valid_dates']['count']} ({stats['valid_dates']['pct']:.2f}%)\n")
-        f.write(f"- **URLs válidas**: {stats['valid_urls']['count']} ({stats['valid_urls']['pct']:.2f}%)\n")
+        f.write(render_profile_md(stats))
 
 def main():
     parser = argparse.ArgumentParser(description="Scraper de noticias y export JSONL")
-    parser.add_argument("--source", required=True, choices=SOURCES.keys(), help="Fuente: eluniversal, bbc, reuters")
-    parser.add_argument("--limit", type=int, default=20, help="Número de noticias a extraer")
+    parser.add_argument("--source", required=True, nargs="+", choices=SOURCES.keys(), help="Fuente(s): eluniversal, bbc, reuters")
+    parser.add_argument("--limit", type=int, default=20, help="Número de noticias a extraer por fuente")
     parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Archivo JSONL de salida")
     parser.add_argument("--profile", default="reports/perfilado.md", help="Ruta del reporte Markdown")
+    parser.add_argument("--concurrency", type=int, default=1, help="Peticiones de artículos en vuelo (1 = modo serial)")
+    parser.add_argument("--parse-workers", type=int, default=0, help="Procesos de parseo con --concurrency > 1 (0 = hilos)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Directorio de la caché HTTP condicional")
+    parser.add_argument("--cache-max-mb", type=int, default=256, help="Tamaño máximo de la caché HTTP (MB)")
+    parser.add_argument("--no-cache", action="store_true", help="Desactiva la caché HTTP")
+    parser.add_argument("--incremental", action="store_true", help="Omite URLs ya capturadas y añade sólo registros nuevos al JSONL")
+    parser.add_argument("--index", default=None, help="Índice de URLs vistas (por defecto <output>.idx)")
+    parser.add_argument("--validate", action="store_true", help="Valida el JSONL de salida contra el data contract")
+    parser.add_argument("--contract", default=DEFAULT_CONTRACT, help="Ruta del data contract YAML")
+    parser.add_argument("--parquet-dir", default=None, help="Además del JSONL, escribe Parquet particionado por fecha/fuente en este directorio")
+    parser.add_argument("--approx-distinct", action="store_true", help="Perfilado con HyperLogLog/Bloom (memoria fija, con cotas de error)")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Sirve métricas Prometheus en este puerto (/metrics)")
+    parser.add_argument("--metrics-snapshot", default=None, help="Escribe un snapshot JSON de las métricas en esta ruta")
+    parser.add_argument("--metrics-interval", type=float, default=None, help="Segundos entre snapshots JSON")
+    parser.add_argument("--profile-cpu", type=float, nargs="?", const=0, default=None, metavar="SEGUNDOS",
+                        help="Perfil por muestreo en reports/profiles (sin valor, toda la ejecución)")
+    parser.add_argument("--profile-memory", action="store_true", help="Con --profile-cpu, añade snapshot de tracemalloc")
+    parser.add_argument("--profile-format", choices=FORMATS, default="both", help="Formato del perfil (collapsed, speedscope)")
     args = parser.parse_args()
+    exporters = start_exporters(args.metrics_port, args.metrics_snapshot, args.metrics_interval)
+    # `kill -USR2 <pid>` perfila una ventana del proceso en marcha (ver src/profiler.py).
+    install_signal_handler("main", fmt=args.profile_format, memory=args.profile_memory or None)
+    if args.profile_cpu is not None:
+        profiling = ProfileSession("main", args.profile_cpu, fmt=args.profile_format, memory=args.profile_memory)
+    else:
+        profiling = start_from_env("main")
 
-    session = requests.Session()
-    listing = SOURCES[args.source]["listing"]
-    domain = SOURCES[args.source]["domain"]
+    index = None
+    if args.incremental:
+        index = SeenIndex(args.index or args.output + ".idx", bootstrap_jsonl=args.output)
+        print(f"[INFO] Índice incremental: {len(index)} URLs ya capturadas")
 
-    print(f"[INFO] Descubriendo enlaces en {listing} ...")
-    links = discover_links(session, listing, domain, limit=args.limit*4)
-    print(f"[INFO] Enlaces candidatos: {len(links)}. Will attempt to scrape up to {args.limit} articles.")
+    rates = {s["domain"]: s["rate"] for s in SOURCES.values()}
+    cache = None if args.no_cache else ResponseCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+    fetcher = Fetcher(rates, pool_maxsize=max(args.concurrency, 1), cache=cache)
 
-    records = []
-    for url in tqdm(links, desc="scraping"):
-        if len(records) >= args.limit:
-            break
-        rec = parse_article(session, url, args.source)
-        if rec:
-            records.append(rec)
-        time.sleep(random.uniform(0.5, 1.3))
+    jobs = []
+    for source_key in args.source:
+        listing = SOURCES[source_key]["listing"]
+        domain = SOURCES[source_key]["domain"]
+        print(f"[INFO] Descubriendo enlaces en {listing} ...")
+        links = discover_links(fetcher, listing, domain, limit=args.limit*4, exclude=index)
+        print(f"[INFO] Enlaces candidatos: {len(links)}. Will attempt to scrape up to {args.limit} articles.")
+        jobs.extend((source_key, url) for url in links)
+
+    if args.concurrency > 1:
+        records = asyncio.run(scrape_concurrent(fetcher, jobs, args.limit, args.concurrency, args.parse_workers))
+    else:
+        records = scrape_serial(fetcher, jobs, args.limit)
+
+    fetcher.close()
 
-    save_jsonl(records, args.output)
-    stats = profile(records)
+    save_jsonl(records, args.output, append=args.incremental)
+    if args.parquet_dir:
+        with ParquetSink(args.parquet_dir, "noticias") as sink:
+            for rec in records:
+                sink.write(rec)
+        print(f"[DONE] Parquet en {sink.path} ({sink.files} archivos)")
+    if index is not None:
+        for rec in records:
+            index.add(rec["url"])
+        index.save()
+    # En modo incremental se perfila el histórico completo, leyendo el JSONL en streaming.
+    if args.incremental:
+        stats = profile_jsonl(args.output, approx=args.approx_distinct)
+    else:
+        stats = profile(records, approx=args.approx_distinct)
     write_profile_md(stats, args.profile)
 
     print(f"[DONE] Guardado {len(records)} registros en {args.output}")
     print(f"[DONE] Perfilado guardado en {args.profile}")
+    if args.validate:
+        result = validate_jsonl(args.output, args.contract)
+        failed = {name: info["violations"] for name, info in result["rules"].items() if info["violations"]}
+        if failed:
+            print(f"[WARN] Contrato incumplido en {result['total']} registros: {failed}")
+        else:
+            print(f"[DONE] Contrato {result['contract']} cumplido ({result['total']} registros)")
+    print(f"[STATS] {fetcher.stats()}")
+    for source_key in args.source:
+        # Con --parse-workers las fechas se normalizan en los procesos hijos.
+        date_stats = get_normalizer(source_key, SOURCES[source_key]["date_formats"]).stats()
+        if date_stats["calls"]:
+            print(f"[STATS] fechas {source_key}: {date_stats}")
+    exporters.stop()
+    if profiling is not None:
+        profiling.stop()
 
 if __name__ == "__main__":
     main()
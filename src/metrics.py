@@ -0,0 +1,243 @@
+"""
+src/metrics.py
+Instrumentación ligera compartida por los scrapers y el streaming: contadores e
+histogramas (los temporizadores son histogramas en segundos) en un registro de
+proceso, exportables como texto Prometheus o como snapshot JSON periódico.
+
+- Cada métrica se obtiene una vez (`REGISTRY.histogram(nombre, ayuda, etapa="parse")`)
+  y después sólo se observa: en el camino caliente no hay búsquedas por nombre.
+- `observe` hace un bisect sobre buckets fijos y actualiza tres contadores bajo un
+  lock (del orden de 1 µs), así que puede quedarse activo en producción.
+- Las métricas viven en el proceso que las registra: lo que se mide en procesos hijos
+  (p. ej. `--parse-workers`) no aparece en el registro del padre.
+
+Exportación:
+  serve_prometheus(9108)                     -> http://127.0.0.1:9108/metrics
+  JsonSnapshotter("reports/metrics.json", 30) -> reescribe el JSON cada 30 s
+  start_exporters(...) arranca lo que se pida (ver METRICS_PORT / METRICS_SNAPSHOT)
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# De 50 µs a 60 s: cubre desde el parseo de un mensaje del WS hasta una descarga lenta.
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DEFAULT_SNAPSHOT_INTERVAL = 30.0
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def sample(self):
+        return {"value": self.value}
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+class Histogram:
+    """Histograma de buckets fijos con suma y conteo, como el de Prometheus."""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)   # el último es +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Context manager que observa los segundos transcurridos en el bloque."""
+        return _Timer(self)
+
+    def quantile(self, q):
+        """Cuantil aproximado: límite superior del bucket donde cae (None sin datos)."""
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def sample(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else None,
+            "p50": self.quantile(0.50),
+            "p99": self.quantile(0.99),
+        }
+
+class Registry:
+    """Familias de métricas por nombre; cada combinación de etiquetas es una métrica."""
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind, name, help_text, labels, factory):
+        key = tuple(sorted(labels.items()))
+        family = self._families.get(name)
+        if family is None or key not in family["metrics"]:
+            with self._lock:
+                family = self._families.setdefault(name, {"type": kind, "help": help_text, "metrics": {}})
+                if family["type"] != kind:
+                    raise ValueError(f"La métrica {name} ya está registrada como {family['type']}")
+                family["metrics"].setdefault(key, factory())
+        return family["metrics"][key]
+
+    def counter(self, name, help_text="", **labels):
+        return self._get("counter", name, help_text, labels, Counter)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS, **labels):
+        return self._get("histogram", name, help_text, labels, lambda: Histogram(buckets))
+
+    def _collect(self):
+        """
+        Copia (nombre, tipo, ayuda, [(etiquetas, métrica)]) tomada bajo el lock: otros hilos
+        pueden registrar métricas nuevas (p. ej. las de cada host en Fetcher) mientras se exporta.
+        """
+        with self._lock:
+            return [(name, family["type"], family["help"], sorted(family["metrics"].items()))
+                    for name, family in sorted(self._families.items())]
+
+    def render_prometheus(self):
+        """Formato de texto de Prometheus (versión 0.0.4)."""
+        lines = []
+        for name, kind, help_text, metrics in self._collect():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, metric in metrics:
+                if kind == "counter":
+                    lines.append(f"{name}{_labels(key)} {metric.value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.bounds, metric.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(key, le=_number(bound))} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(key, le='+Inf')} {metric.count}")
+                lines.append(f"{name}_sum{_labels(key)} {metric.sum}")
+                lines.append(f"{name}_count{_labels(key)} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """{nombre: [{"labels": {...}, valores...}]} para el JSON periódico o los reportes."""
+        return {
+            name: [dict(metric.sample(), labels=dict(key)) for key, metric in metrics]
+            for name, _, _, metrics in self._collect()
+        }
+
+    def write_snapshot(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        payload = {"ts": time.time(), "pid": os.getpid(), "metrics": self.snapshot()}
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+
+def _number(value):
+    return repr(float(value))
+
+def _labels(key, **extra):
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+REGISTRY = Registry()
+
+def serve_prometheus(port, host="127.0.0.1", registry=REGISTRY):
+    """Sirve `/metrics` en un hilo de fondo. Devuelve el servidor (`shutdown()` para pararlo)."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class JsonSnapshotter:
+    """Hilo de fondo que reescribe `path` con el snapshot cada `interval` segundos."""
+    def __init__(self, path, interval=DEFAULT_SNAPSHOT_INTERVAL, registry=REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.registry.write_snapshot(self.path)
+
+    def stop(self):
+        """Detiene el hilo y escribe un último snapshot con los valores finales."""
+        self._stop.set()
+        self._thread.join()
+        self.registry.write_snapshot(self.path)
+
+class Exporters:
+    def __init__(self, server=None, snapshotter=None):
+        self.server = server
+        self.snapshotter = snapshotter
+
+    def stop(self):
+        if self.snapshotter is not None:
+            self.snapshotter.stop()
+        if self.server is not None:
+            self.server.shutdown()
+
+def start_exporters(port=None, snapshot_path=None, interval=None, host=None):
+    """
+    Arranca los exportadores pedidos; sin argumentos usa METRICS_PORT, METRICS_HOST,
+    METRICS_SNAPSHOT y METRICS_INTERVAL. Devuelve un `Exporters` con `stop()`.
+    """
+    port = port or (int(os.environ["METRICS_PORT"]) if os.getenv("METRICS_PORT") else None)
+    snapshot_path = snapshot_path or os.getenv("METRICS_SNAPSHOT") or None
+    interval = interval or float(os.getenv("METRICS_INTERVAL", DEFAULT_SNAPSHOT_INTERVAL))
+    host = host or os.getenv("METRICS_HOST", "127.0.0.1")
+    server = serve_prometheus(port, host) if port else None
+    snapshotter = JsonSnapshotter(snapshot_path, interval) if snapshot_path else None
+    if server is not None:
+        print(f"[INFO] Métricas Prometheus en http://{host}:{port}/metrics")
+    if snapshotter is not None:
+        print(f"[INFO] Snapshot de métricas cada {interval:g}s en {snapshot_path}")
+    return Exporters(server, snapshotter)
@@ -0,0 +1,271 @@
+"""
+src/profiler.py
+Profiler estadístico opcional para procesos en producción (src/main.py y
+src/streaming/stream_dual_ws.py), sin dependencias externas.
+
+Un hilo de fondo toma cada `interval` segundos las pilas de todos los hilos
+(`sys._current_frames()`) y cuenta cuántas veces aparece cada pila. El coste es
+proporcional a la frecuencia de muestreo y no al trabajo del programa: a 100 Hz es
+despreciable. Es tiempo de reloj: por defecto se descartan las pilas que sólo
+esperan (select del event loop, Event.wait, queue.get...), así que lo que queda es
+dónde se ejecuta código Python.
+
+Salida en reports/profiles/:
+- `<nombre>-<pid>-<fecha>.collapsed`: pilas colapsadas (`hilo;f1;f2 N`), para
+  flamegraph.pl, inferno o speedscope.
+- `<nombre>-<pid>-<fecha>.speedscope.json`: perfil por hilo para https://www.speedscope.app
+- con `memory=True`, además `.alloc.txt` (líneas que más memoria asignaron durante
+  la ventana) y `.tracemalloc` (snapshot completo para `tracemalloc.Snapshot.load`).
+  tracemalloc sí es caro (el código que asigna mucho va varias veces más lento), así
+  que conviene limitarlo a ventanas cortas.
+
+Disparadores:
+- `--profile-cpu [SEGUNDOS]` en src/main.py (sin segundos, toda la ejecución).
+- `PROFILE_CPU=<segundos>` (0 = hasta el final), `PROFILE_FORMAT`, `PROFILE_MEMORY=1`.
+- `kill -USR2 <pid>`: perfila los siguientes PROFILE_SIGNAL_SECONDS (30) segundos del
+  proceso en marcha, sin reiniciarlo.
+"""
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_INTERVAL = 0.01
+DEFAULT_OUT_DIR = Path(__file__).resolve().parents[1] / "reports" / "profiles"
+DEFAULT_SIGNAL_SECONDS = 30.0
+FORMATS = ("collapsed", "speedscope", "both")
+MEMORY_TOP = 30
+# Un frame basta para el top por línea; cada frame extra encarece más cada asignación.
+MEMORY_FRAMES = 1
+
+# Funciones hoja que sólo esperan (por archivo de la stdlib); se descartan salvo con idle=True.
+IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("socketserver.py", "serve_forever"),
+    ("thread.py", "_worker"),
+}
+
+class SamplingProfiler:
+    def __init__(self, interval=DEFAULT_INTERVAL, idle=False, memory=False):
+        self.interval = interval
+        self.idle = idle
+        self.memory = memory
+        self.samples = Counter()      # (hilo, (código, ...)) -> muestras
+        self.sampled = 0
+        self.started = self.stopped = None
+        self.snapshot = None
+        self._labels = {}             # código -> (nombre, archivo, línea)
+        self._names = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._traced_here = False
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_FRAMES)
+            self._traced_here = True
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped = time.time()
+        if self.memory and tracemalloc.is_tracing():
+            self.snapshot = tracemalloc.take_snapshot()
+            if self._traced_here:
+                tracemalloc.stop()
+        return self
+
+    def _thread_name(self, ident):
+        name = self._names.get(ident)
+        if name is None:
+            self._names = {t.ident: t.name for t in threading.enumerate()}
+            name = self._names.get(ident, f"thread-{ident}")
+        return name
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                if not self.idle and self._is_idle(stack[0]):
+                    continue
+                stack.reverse()
+                self.samples[(self._thread_name(ident), tuple(stack))] += 1
+            self.sampled += 1
+
+    def _is_idle(self, code):
+        return (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = (code.co_name, code.co_filename, code.co_firstlineno)
+        return label
+
+    def collapsed(self):
+        """Líneas `hilo;f1 (archivo:línea);f2 ... N`, de la raíz a la hoja."""
+        lines = []
+        for (thread, stack), count in self.samples.most_common():
+            frames = [f"{name} ({os.path.basename(path)}:{line})" for name, path, line in map(self._label, stack)]
+            lines.append(";".join([thread.replace(";", "_")] + [f.replace(";", "_") for f in frames]) + f" {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name="profile"):
+        """Perfil en el formato de speedscope: un perfil `sampled` por hilo."""
+        frames, index = [], {}
+        per_thread = {}
+        for (thread, stack), count in self.samples.items():
+            ids = []
+            for code in stack:
+                if code not in index:
+                    fname, path, line = self._label(code)
+                    index[code] = len(frames)
+                    frames.append({"name": fname, "file": path, "line": line})
+                ids.append(index[code])
+            samples, weights = per_thread.setdefault(thread, ([], []))
+            samples.append(ids)
+            weights.append(round(count * self.interval, 6))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "src/profiler.py",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled", "name": thread, "unit": "seconds",
+                "startValue": 0, "endValue": round(sum(weights), 6),
+                "samples": samples, "weights": weights,
+            } for thread, (samples, weights) in sorted(per_thread.items())],
+        }
+
+    def write(self, out_dir=DEFAULT_OUT_DIR, name="profile", fmt="both"):
+        """Escribe los archivos pedidos y devuelve sus rutas."""
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.fromtimestamp(self.started or time.time()).strftime("%Y%m%d-%H%M%S")
+        base = out_dir / f"{name}-{os.getpid()}-{stamp}"
+        paths = []
+        if fmt in ("collapsed", "both"):
+            path = base.with_suffix(".collapsed")
+            path.write_text(self.collapsed(), encoding="utf-8")
+            paths.append(path)
+        if fmt in ("speedscope", "both"):
+            path = base.with_suffix(".speedscope.json")
+            path.write_text(json.dumps(self.speedscope(name)), encoding="utf-8")
+            paths.append(path)
+        if self.snapshot is not None:
+            path = base.with_suffix(".tracemalloc")
+            self.snapshot.dump(str(path))
+            paths.append(path)
+            path = base.with_suffix(".alloc.txt")
+            top = self.snapshot.statistics("lineno")[:MEMORY_TOP]
+            path.write_text("\n".join(str(stat) for stat in top) + "\n", encoding="utf-8")
+            paths.append(path)
+        return paths
+
+    def summary(self):
+        return {
+            "seconds": round((self.stopped or time.time()) - (self.started or time.time()), 1),
+            "ticks": self.sampled,
+            "stacks": len(self.samples),
+            "samples": sum(self.samples.values()),
+        }
+
+def _finish(profiler, out_dir, name, fmt):
+    profiler.stop()
+    paths = profiler.write(out_dir, name, fmt)
+    print(f"[DONE] Perfil {profiler.summary()}: {', '.join(str(p) for p in paths)}")
+    return paths
+
+class ProfileWindow:
+    """Perfil de `seconds` en segundo plano; `finish()` lo cierra antes y espera a que se escriba."""
+    def __init__(self, seconds, name="profile", out_dir=DEFAULT_OUT_DIR, fmt="both", interval=DEFAULT_INTERVAL,
+                 memory=False):
+        self.profiler = SamplingProfiler(interval, memory=memory).start()
+        self._done = threading.Event()
+
+        def finish_later():
+            self._done.wait(seconds)   # hoja `wait`: la ventana no se cuenta a sí misma
+            _finish(self.profiler, out_dir, name, fmt)
+        self._thread = threading.Thread(target=finish_later, name="profile-window", daemon=True)
+        self._thread.start()
+
+    @property
+    def active(self):
+        return self._thread.is_alive()
+
+    def finish(self):
+        self._done.set()
+        self._thread.join()
+
+def profile_window(seconds, name="profile", out_dir=DEFAULT_OUT_DIR, fmt="both", interval=DEFAULT_INTERVAL,
+                   memory=False):
+    """Perfila los próximos `seconds` en segundo plano y escribe el resultado al terminar."""
+    return ProfileWindow(seconds, name, out_dir, fmt, interval, memory)
+
+class ProfileSession:
+    """Perfil hasta `stop()` (o una ventana de `seconds` si se indica), para toda una ejecución."""
+    def __init__(self, name, seconds=None, out_dir=DEFAULT_OUT_DIR, fmt="both", interval=DEFAULT_INTERVAL,
+                 memory=False):
+        self.name, self.out_dir, self.fmt = name, out_dir, fmt
+        self.window = profile_window(seconds, name, out_dir, fmt, interval, memory) if seconds else None
+        self.profiler = self.window.profiler if self.window else SamplingProfiler(interval, memory=memory).start()
+        print(f"[INFO] Profiler activo ({'%gs' % seconds if seconds else 'toda la ejecución'}, "
+              f"cada {interval * 1000:g} ms{', con tracemalloc' if memory else ''})")
+
+    def stop(self):
+        """Cierra el perfil y lo escribe; si la ventana no había terminado, se guarda lo muestreado."""
+        if self.window is not None:
+            self.window.finish()
+        else:
+            _finish(self.profiler, self.out_dir, self.name, self.fmt)
+
+def install_signal_handler(name, sig=None, seconds=None, out_dir=DEFAULT_OUT_DIR, fmt="both", memory=None):
+    """
+    Al recibir `sig` (SIGUSR2 por defecto) perfila los siguientes `seconds` sin parar el
+    proceso; señales repetidas durante una ventana en curso se ignoran. No hace nada en
+    plataformas sin la señal (Windows) o fuera del hilo principal.
+    """
+    sig = sig or getattr(signal, "SIGUSR2", None)
+    if sig is None or threading.current_thread() is not threading.main_thread():
+        return False
+    seconds = seconds or float(os.getenv("PROFILE_SIGNAL_SECONDS", DEFAULT_SIGNAL_SECONDS))
+    memory = os.getenv("PROFILE_MEMORY") == "1" if memory is None else memory
+    active = []
+
+    def handler(signum, frame):
+        if active and active[-1].active:
+            return
+        print(f"[INFO] Señal {signum}: perfilando {seconds:g}s")
+        active.append(profile_window(seconds, name, out_dir, fmt, memory=memory))
+
+    signal.signal(sig, handler)
+    return True
+
+def start_from_env(name):
+    """ProfileSession según PROFILE_CPU (segundos; 0 = hasta `stop()`), o None si no está definida."""
+    value = os.getenv("PROFILE_CPU")
+    if value is None or value == "":
+        return None
+    fmt = os.getenv("PROFILE_FORMAT", "both")
+    interval = float(os.getenv("PROFILE_INTERVAL", DEFAULT_INTERVAL))
+    return ProfileSession(name, float(value) or None, fmt=fmt, interval=interval,
+                          memory=os.getenv("PROFILE_MEMORY") == "1")
@@ -7,8 +7,13 @@ import random
 import time
 from pathlib import Path
 import re
-from collections import defaultdict
 import argparse
+from urllib.parse import urlparse
+
+from data.profiling import StreamingProfiler, render_quality_report
+from dates import get_normalizer
+from fetcher import Fetcher
+from metrics import REGISTRY
 
 # --- Constantes y Configuración ---
 
@@ -16,6 +21,7 @@ import argparse
 # URL: https://www.reuters.com/world/ [cite: 11]
 SOURCE_URL = "https://www.reuters.com/world/"
 SOURCE_NAME = "Reuters"
+SOURCE_RATE = 1.0  # peticiones por segundo permitidas contra el dominio de `url`
 
 # Define las rutas de salida para los datos y reportes.
 # Los entregables son el archivo de datos y el reporte de perfilado. [cite: 53, 55]
@@ -24,6 +30,8 @@ OUTPUT_REPORTS_DIR = Path("reports")
 OUTPUT_FILE = OUTPUT_DATA_DIR / "noticias.jsonl"
 REPORT_FILE = OUTPUT_REPORTS_DIR / "perfilado.md"
 
+PARSE_SECONDS = REGISTRY.histogram("scraper_stage_seconds", "Duración de cada etapa del scraper", stage="parse_listing")
+
 def get_random_user_agent():
     """Selecciona un User-Agent aleatorio para simular un navegador real."""
     USER_AGENTS = [
@@ -39,17 +47,20 @@ class NewsScraper:
     """
     Una clase para encapsular la lógica de scraping de un sitio de noticias.
     """
-    def __init__(self, url, source_name):
+    def __init__(self, url, source_name, rate=SOURCE_RATE):
         self.url = url
         self.source_name = source_name
-        self.session = requests.Session()
-        self.session.headers.update({
+        # El limitador y el pool keep-alive los gestiona la capa compartida `Fetcher`.
+        # El límite va al dominio de `url` (sin "www.", para cubrir sus subdominios).
+        domain = (urlparse(url).hostname or "").removeprefix("www.")
+        self.fetcher = Fetcher({domain: rate}, headers={
             'User-Agent': get_random_user_agent(),
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.5',
             'Connection': 'keep-alive',
             'DNT': '1',
         })
+        self.session = self.fetcher.session
         print(f"Scraper inicializado para la fuente: {self.source_name}")
 
     def _generate_id(self, text_input):
@@ -59,7 +70,7 @@ class NewsScraper:
     def fetch_content(self):
         """Realiza la petición HTTP para obtener el contenido de la página."""
         try:
-            response = self.session.get(self.url, timeout=20)
+            response = self.fetcher.get(self.url, timeout=20)
             response.raise_for_status()  # Lanza una excepción para códigos de error HTTP
             print(f"✓ Contenido de {self.url} obtenido con éxito.")
             return response.text
@@ -72,7 +83,8 @@ class NewsScraper:
         if not html_content:
             return []
 
-        soup = BeautifulSoup(html_content, 'html.parser')
+        with PARSE_SECONDS.time():
+            soup = BeautifulSoup(html_content, 'html.parser')
         
         # Estrategia de búsqueda de contenedores de noticias
         # Se priorizan selectores específicos y luego se usan genéricos.
@@ -101,10 +113,10 @@ class NewsScraper:
             date_element = article_html.find('time')
             iso_date = datetime.now().strftime('%Y-%m-%d') # Fecha por defecto
             if date_element and date_element.has_attr('datetime'):
-                try:
-                    iso_date = datetime.fromisoformat(date_element['datetime'].replace('Z', '+00:00')).strftime('%Y-%m-%d')
-                except ValueError:
-                    pass # Mantiene la fecha por defecto si el formato es inesperado
+                # Normalizador compartido (ISO rápido + caché); None si el formato es inesperado
+                parsed_date = get_normalizer(self.source_name).to_utc(date_element['datetime'])
+                if parsed_date:
+                    iso_date = parsed_date.strftime('%Y-%m-%d')
 
             # El autor rara vez está en la página principal, se asigna un valor por defecto.
             author = "Reuters Staff" # Campo `autor` es requerido [cite: 18]
@@ -143,60 +155,10 @@ def generate_data_quality_report(records):
     """
     Analiza los datos recolectados y genera un reporte en formato Markdown.
     El reporte incluye total de registros, nulos, duplicados y consistencia. [cite: 27, 29-32]
+    Acepta cualquier iterable de registros; el perfilado se hace en una sola pasada.
     """
-    if not records:
-        return "No se encontraron registros para analizar."
-
-    total_records = len(records)
-    null_counts = defaultdict(int)
-    url_set = set()
-    id_set = set()
-    
-    date_format_regex = re.compile(r'^\d{4}-\d{2}-\d{2}$')
-    url_format_regex = re.compile(r'^https?://')
-    
-    valid_dates = 0
-    valid_urls = 0
-
-    for record in records:
-        for key, value in record.items():
-            if value is None or (isinstance(value, str) and not value.strip()):
-                null_counts[key] += 1
-        
-        # Conteo de duplicados y validación de formatos
-        url_set.add(record.get("url"))
-        id_set.add(record.get("id"))
-        if record.get("fecha") and date_format_regex.match(record.get("fecha")):
-            valid_dates += 1
-        if record.get("url") and url_format_regex.match(record.get("url")):
-            valid_urls += 1
-
-    # Construcción del reporte
-    report = [
-        f"# Reporte de Calidad de Datos - {datetime.now(timezone.utc).date()}",
-        f"**Fuente de Datos:** {records[0].get('fuente', 'N/A')}\n",
-        f"## 1. Resumen General",
-        f"- **Número total de registros:** {total_records}\n",
-        f"## 2. Completitud (Valores Nulos)",
-        "| Campo          | % Nulos |",
-        "|----------------|---------|",
-    ]
-    
-    fields = list(records[0].keys())
-    for field in fields:
-        percentage = (null_counts[field] / total_records) * 100
-        report.append(f"| {field:<14} | {percentage:.2f}%   |")
-
-    report.extend([
-        "\n## 3. Unicidad",
-        f"- **IDs únicos:** {len(id_set)} de {total_records} (Duplicados: {total_records - len(id_set)})",
-        f"- **URLs únicas:** {len(url_set)} de {total_records} (Duplicados: {total_records - len(url_set)})\n",
-        "## 4. Consistencia de Formato",
-        f"- **Fechas en formato YYYY-MM-DD:** {valid_dates / total_records:.2%}",
-        f"- **URLs con prefijo http(s)://:** {valid_urls / total_records:.2%}"
-    ])
-
-    return "\n".join(report)
+    stats = StreamingProfiler("scraper").consume(records).result()
+    return render_quality_report(stats)
 
 # --- Punto de Entrada Principal ---
 
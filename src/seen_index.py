@@ -0,0 +1,53 @@
+"""
+src/seen_index.py
+Índice persistente de URLs ya capturadas, para el scraping incremental.
+
+Guarda una línea por artículo con el hash corto de su URL (el mismo sha1[:12]
+que forma el `id` en src/main.py), así que el archivo crece 13 bytes por
+registro. En memoria se mantiene como un set de bytes, con pertenencia O(1).
+Si el índice no existe se reconstruye a partir del JSONL de salida.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+def url_digest(url):
+    """Hash corto de la URL usado en los ids (`<fuente>-<digest>`)."""
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+
+class SeenIndex:
+    def __init__(self, path, bootstrap_jsonl=None):
+        self.path = Path(path)
+        self._seen = set()
+        self._pending = []
+        if self.path.exists():
+            with self.path.open("r", encoding="ascii") as f:
+                self._seen.update(bytes.fromhex(line.strip()) for line in f if line.strip())
+        elif bootstrap_jsonl and Path(bootstrap_jsonl).exists():
+            with open(bootstrap_jsonl, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        url = json.loads(line).get("url")
+                        if url:
+                            self.add(url)
+
+    def __contains__(self, url):
+        return bytes.fromhex(url_digest(url)) in self._seen
+
+    def __len__(self):
+        return len(self._seen)
+
+    def add(self, url):
+        key = bytes.fromhex(url_digest(url))
+        if key not in self._seen:
+            self._seen.add(key)
+            self._pending.append(key)
+
+    def save(self):
+        """Añade al archivo sólo las entradas nuevas desde la última llamada."""
+        if not self._pending:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="ascii") as f:
+            f.writelines(key.hex() + "\n" for key in self._pending)
+        self._pending = []
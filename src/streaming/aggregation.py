@@ -0,0 +1,142 @@
+"""
+src/streaming/aggregation.py
+Agregación en vivo de trades: barras OHLCV y VWAP móvil, en O(1) por trade.
+
+- `TradeRing`: ring buffer de tamaño fijo sobre arrays (`array` de la librería
+  estándar, no dicts) con tiempo, precio y cantidad. Mantiene las sumas de
+  precio*cantidad y cantidad de la ventana, así que el VWAP y el volumen móviles
+  se actualizan al insertar y al expulsar, sin recorrer la ventana.
+- `BarBuilder`: barra OHLCV de un intervalo fijo; al llegar un trade de un
+  intervalo posterior devuelve la barra cerrada y empieza la siguiente.
+- `TradeAggregator`: ring + una barra por intervalo (1s y 1m por defecto) para un
+  instrumento. Los tiempos son los del exchange (epoch en ms).
+"""
+from array import array
+
+from streaming.codec import ms_to_iso
+
+DEFAULT_CAPACITY = 65536
+DEFAULT_WINDOW_MS = 60_000
+DEFAULT_INTERVALS = {"1s": 1000, "1m": 60_000}
+
+class TradeRing:
+    def __init__(self, capacity=DEFAULT_CAPACITY, window_ms=DEFAULT_WINDOW_MS):
+        self.capacity = capacity
+        self.window_ms = window_ms
+        self.ts = array("q", bytes(8 * capacity))
+        self.price = array("d", bytes(8 * capacity))
+        self.qty = array("d", bytes(8 * capacity))
+        self.head = 0       # próxima posición de escritura
+        self.size = 0
+        self.notional = 0.0
+        self.volume = 0.0
+
+    def _evict(self):
+        tail = (self.head - self.size) % self.capacity
+        self.notional -= self.price[tail] * self.qty[tail]
+        self.volume -= self.qty[tail]
+        self.size -= 1
+
+    def push(self, ts_ms, price, qty):
+        if self.size == self.capacity:
+            self._evict()
+        i = self.head
+        self.ts[i], self.price[i], self.qty[i] = ts_ms, price, qty
+        self.head = (i + 1) % self.capacity
+        self.size += 1
+        self.notional += price * qty
+        self.volume += qty
+        # Expulsa lo que quedó fuera de la ventana temporal (amortizado O(1)).
+        cutoff = ts_ms - self.window_ms
+        while self.size and self.ts[(self.head - self.size) % self.capacity] <= cutoff:
+            self._evict()
+        if self.size == 0:
+            # Evita que el error de redondeo acumulado sobreviva a una ventana vacía.
+            self.notional = self.volume = 0.0
+
+    def vwap(self):
+        return self.notional / self.volume if self.volume > 0 else None
+
+class BarBuilder:
+    def __init__(self, interval_ms):
+        self.interval_ms = interval_ms
+        self.start = None
+
+    def _open(self, start, price, qty):
+        self.start = start
+        self.open = self.high = self.low = self.close = price
+        self.volume = qty
+        self.quote_volume = price * qty
+        self.trades = 1
+
+    def add(self, ts_ms, price, qty):
+        """Añade un trade. Devuelve la barra cerrada si el trade empieza un intervalo nuevo."""
+        start = ts_ms - ts_ms % self.interval_ms
+        if self.start is None:
+            self._open(start, price, qty)
+            return None
+        if start > self.start:
+            bar = self.bar()
+            self._open(start, price, qty)
+            return bar
+        # Trades del mismo intervalo (o rezagados de uno ya cerrado) se suman a la barra abierta.
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += qty
+        self.quote_volume += price * qty
+        self.trades += 1
+        return None
+
+    def bar(self):
+        if self.start is None:
+            return None
+        return {
+            "start_ms": self.start,
+            "open": self.open, "high": self.high, "low": self.low, "close": self.close,
+            "volume": self.volume, "quote_volume": self.quote_volume, "trades": self.trades,
+        }
+
+class TradeAggregator:
+    def __init__(self, instrument, intervals=None, capacity=DEFAULT_CAPACITY, window_ms=DEFAULT_WINDOW_MS,
+                 source="binance"):
+        self.instrument = instrument
+        self.source = source
+        self.ring = TradeRing(capacity, window_ms)
+        self.builders = {label: BarBuilder(ms) for label, ms in (intervals or DEFAULT_INTERVALS).items()}
+
+    def _record(self, label, bar):
+        volume = bar["volume"]
+        return {
+            "ts": ms_to_iso(bar["start_ms"]),
+            "source": self.source,
+            "instrument": self.instrument,
+            "interval": label,
+            "open": bar["open"], "high": bar["high"], "low": bar["low"], "close": bar["close"],
+            "volume": volume,
+            "quote_volume": bar["quote_volume"],
+            "trades": bar["trades"],
+            "vwap": bar["quote_volume"] / volume if volume > 0 else None,
+            "rolling_vwap": self.ring.vwap(),
+            "rolling_volume": self.ring.volume,
+        }
+
+    def add(self, ts_ms, price, qty):
+        """Procesa un trade. Devuelve [(intervalo, barra)] con las barras que se cerraron."""
+        closed = []
+        for label, builder in self.builders.items():
+            bar = builder.add(ts_ms, price, qty)
+            if bar is not None:
+                closed.append((label, self._record(label, bar)))
+        self.ring.push(ts_ms, price, qty)
+        return closed
+
+    def flush(self):
+        """Barras abiertas al terminar el stream, marcadas como parciales."""
+        closed = []
+        for label, builder in self.builders.items():
+            if builder.start is not None:
+                closed.append((label, dict(self._record(label, builder.bar()), partial=True)))
+        return closed
@@ -0,0 +1,91 @@
+"""
+src/streaming/backfill.py
+Recuperación de huecos del stream de trades a través de la API REST de Binance.
+
+Los ids de `trade` y `aggTrade` son consecutivos por símbolo, así que un salto entre
+el último id visto y el que acaba de llegar (típicamente tras una reconexión) indica
+trades perdidos. `TradeBackfill.fetch_range` los pide por páginas a
+`/api/v3/historicalTrades` o `/api/v3/aggTrades` y los devuelve con la misma forma
+que los mensajes del WebSocket, para que pasen por los mismos normalizadores.
+La URL base es configurable (BINANCE_REST_URL) para usar un servidor local en pruebas.
+"""
+import os
+import time
+from urllib.parse import urlparse
+
+from fetcher import Fetcher
+
+BINANCE_REST_URL = os.getenv("BINANCE_REST_URL", "https://api.binance.com")
+REST_PAGE_SIZE = 1000                                       # máximo que admite Binance
+REST_RATE = float(os.getenv("BINANCE_REST_RATE", "5"))      # peticiones por segundo
+MAX_BACKFILL = int(os.getenv("WS_MAX_BACKFILL", "10000"))   # trades recuperados por hueco como mucho
+
+ENDPOINTS = {"trade": "/api/v3/historicalTrades", "aggTrade": "/api/v3/aggTrades"}
+
+def rest_to_ws(stream_type, symbol, row):
+    """Convierte una fila REST al esquema del mensaje WebSocket equivalente."""
+    if stream_type == "trade":
+        return {"e": "trade", "E": row["time"], "s": symbol, "t": row["id"], "p": row["price"],
+                "q": row["qty"], "T": row["time"], "m": row["isBuyerMaker"], "M": row.get("isBestMatch", True)}
+    return {"e": "aggTrade", "E": row["T"], "s": symbol, "a": row["a"], "p": row["p"], "q": row["q"],
+            "f": row["f"], "l": row["l"], "T": row["T"], "m": row["m"], "M": row.get("M", True)}
+
+def _seq(stream_type, row):
+    return row["id"] if stream_type == "trade" else row["a"]
+
+class TradeBackfill:
+    def __init__(self, base_url=BINANCE_REST_URL, max_trades=MAX_BACKFILL, rate=REST_RATE):
+        self.base_url = base_url.rstrip("/")
+        self.max_trades = max_trades
+        self.fetcher = Fetcher({urlparse(self.base_url).hostname: rate})
+        self.gaps = {}          # (símbolo, tipo) -> huecos detectados
+        self.missing = {}       # (símbolo, tipo) -> trades que faltaban
+        self.recovered = {}     # (símbolo, tipo) -> trades recuperados
+        self.latencies = []     # segundos por hueco recuperado
+
+    def supports(self, stream_type):
+        return stream_type in ENDPOINTS
+
+    def fetch_range(self, symbol, stream_type, first, last):
+        """
+        Trades con id en [first, last] (como mucho `max_trades`), ordenados por id.
+        Bloqueante: desde asyncio se llama con `asyncio.to_thread`.
+        """
+        key = (symbol, stream_type)
+        self.gaps[key] = self.gaps.get(key, 0) + 1
+        self.missing[key] = self.missing.get(key, 0) + (last - first + 1)
+        last = min(last, first + self.max_trades - 1)
+
+        started = time.monotonic()
+        url = self.base_url + ENDPOINTS[stream_type]
+        rows, next_id = [], first
+        while next_id <= last:
+            limit = min(REST_PAGE_SIZE, last - next_id + 1)
+            response = self.fetcher.get(url, params={"symbol": symbol, "fromId": next_id, "limit": limit}, timeout=10)
+            response.raise_for_status()
+            page = [row for row in response.json() if next_id <= _seq(stream_type, row) <= last]
+            if not page:
+                break
+            rows.extend(rest_to_ws(stream_type, symbol, row) for row in page)
+            next_id = _seq(stream_type, page[-1]) + 1
+        self.latencies.append(time.monotonic() - started)
+        self.recovered[key] = self.recovered.get(key, 0) + len(rows)
+        return rows
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        missing = sum(self.missing.values())
+        recovered = sum(self.recovered.values())
+        return {
+            "gaps": sum(self.gaps.values()),
+            "gaps_by_stream": {f"{s}@{t}": n for (s, t), n in self.gaps.items()},
+            "missing_trades": missing,
+            "recovered_trades": recovered,
+            "unrecovered_trades": missing - recovered,
+            "backfill_p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+            "backfill_max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+            "rest_requests": self.fetcher.requests,
+        }
+
+    def close(self):
+        self.fetcher.close()
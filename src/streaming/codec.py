@@ -0,0 +1,91 @@
+"""
+src/streaming/codec.py
+Codificación y decodificación JSON para los módulos de streaming.
+
+Usa orjson o msgspec si están instalados y, si no, la librería estándar. Todos los
+codecs exponen la misma interfaz: `loads(str|bytes)` y `dump_line(obj)`, que devuelve
+la línea JSONL ya en bytes (con el salto de línea) lista para `JsonlSink.write_raw`.
+Se elige con la variable WS_CODEC (auto, orjson, msgspec, json).
+
+`ms_to_iso` formatea el tiempo de evento del exchange (epoch en ms) en ISO-8601 UTC
+reutilizando el prefijo del segundo en curso, en lugar de llamar a
+`datetime.now().isoformat()` por mensaje.
+"""
+import json
+import os
+from datetime import datetime, timezone
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+class JsonCodec:
+    name = "json"
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dump_line(self, obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+class OrjsonCodec:
+    name = "orjson"
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dump_line(self, obj):
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+
+class MsgspecCodec:
+    name = "msgspec"
+
+    def __init__(self):
+        self._decoder = msgspec.json.Decoder()
+        self._encoder = msgspec.json.Encoder()
+
+    def loads(self, data):
+        return self._decoder.decode(data)
+
+    def dump_line(self, obj):
+        return self._encoder.encode(obj) + b"\n"
+
+CODECS = {"orjson": OrjsonCodec, "msgspec": MsgspecCodec, "json": JsonCodec}
+AVAILABLE = {"orjson": orjson is not None, "msgspec": msgspec is not None, "json": True}
+
+def get_codec(name=None):
+    """Codec por nombre; con None o "auto", el más rápido disponible."""
+    name = name or os.getenv("WS_CODEC", "auto")
+    if name == "auto":
+        name = next(n for n in ("orjson", "msgspec", "json") if AVAILABLE[n])
+    if name not in CODECS:
+        raise ValueError(f"Codec desconocido: {name}")
+    if not AVAILABLE[name]:
+        raise SystemExit(f"Falta '{name}'. Instala con: pip install {name}")
+    return CODECS[name]()
+
+class EventClock:
+    """Formatea epoch en ms como ISO-8601 UTC; el prefijo se recalcula una vez por segundo."""
+    def __init__(self):
+        self._second = None
+        self._prefix = ""
+
+    def iso(self, ms):
+        second, millis = divmod(int(ms), 1000)
+        if second != self._second:
+            self._second = second
+            self._prefix = datetime.fromtimestamp(second, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+        return f"{self._prefix}.{millis:03d}+00:00"
+
+_clock = EventClock()
+ms_to_iso = _clock.iso
+
+def now_iso():
+    """Hora actual en el mismo formato, para mensajes sin tiempo de evento (bookTicker)."""
+    return _clock.iso(datetime.now(timezone.utc).timestamp() * 1000)
@@ -1,42 +1,158 @@
-# src/streaming/poll_binance_http.py
-import json, time, os
+# src/streaming/poll_coincap_http.py  (ticker de precios de Binance por HTTP)
+"""
+Poller de precios multi-símbolo sobre la API REST de Binance.
+
+- Una sola petición por tick para todos los símbolos (`/api/v3/ticker/price?symbols=[...]`),
+  o, con `batch=False`, una por símbolo en paralelo sobre el mismo pool keep-alive.
+- Reloj de ritmo fijo: el tick `i` se programa en `inicio + i * intervalo` (monotónico),
+  así que la latencia de las peticiones no acumula deriva. Los ticks que no llegan a
+  tiempo se saltan y se cuentan.
+- Escritura con buffer mediante JsonlSink, un archivo por símbolo y día.
+
+Importar el módulo no hace peticiones, no crea archivos ni toca sys.path: quien lo
+importe debe tener src/ en el path (como benchmarks/bench_suite.py).
+
+Uso:
+  python src/streaming/poll_coincap_http.py --symbols BTCUSDT ETHUSDT --interval 5 --iterations 20
+"""
+import argparse, json, os, sys, time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 
-try:
-    import requests
-except ImportError:
-    raise SystemExit("Falta 'requests'. Instala con: pip install requests")
-
-# Rutas relativas al raíz del proyecto (<root>/src/streaming/poll_binance_http.py)
+# Rutas relativas al raíz del proyecto (<root>/src/streaming/poll_coincap_http.py)
 ROOT_DIR = Path(__file__).resolve().parents[2]   # streaming/ -> src/ -> root
 OUT_DIR = ROOT_DIR / "data"
-OUT_DIR.mkdir(parents=True, exist_ok=True)
+if __name__ == "__main__":
+    sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from data.sinks import JsonlSink  # noqa: E402
+from fetcher import Fetcher  # noqa: E402
 
 # Parámetros (override por variables de entorno)
-SYMBOL       = os.getenv("POLL_SYMBOL", "BTCUSDT").upper()   # p.ej. BTCUSDT, ETHUSDT
-INTERVAL_SEC = int(os.getenv("POLL_INTERVAL_SEC", "5"))      # segundos entre lecturas
-ITERATIONS   = int(os.getenv("POLL_ITERATIONS", "20"))       # número de lecturas
+SYMBOLS      = [s.strip().upper() for s in os.getenv("POLL_SYMBOLS", os.getenv("POLL_SYMBOL", "BTCUSDT")).split(",") if s.strip()]
+INTERVAL_SEC = float(os.getenv("POLL_INTERVAL_SEC", "5"))     # segundos entre lecturas
+ITERATIONS   = int(os.getenv("POLL_ITERATIONS", "20"))        # número de lecturas
+BASE_URL     = os.getenv("BINANCE_REST_URL", "https://api.binance.com")
+
+TICKER_PATH = "/api/v3/ticker/price"
+
+class PricePoller:
+    def __init__(self, symbols=None, interval=INTERVAL_SEC, base_url=BASE_URL, out_dir=OUT_DIR,
+                 batch=True, fetcher=None):
+        self.symbols = [s.upper() for s in (symbols or SYMBOLS)]
+        self.interval = interval
+        self.url = base_url.rstrip("/") + TICKER_PATH
+        self.out_dir = out_dir
+        self.batch = batch
+        # Sin límite propio de ritmo: el reloj del poller ya marca la cadencia.
+        self.fetcher = fetcher or Fetcher(default_rate=1000, pool_maxsize=max(4, len(self.symbols)))
+        self._pool = None if batch else ThreadPoolExecutor(max_workers=len(self.symbols))
+        self.sinks = {}
+        self.ticks = 0
+        self.skipped_ticks = 0
+        self.errors = 0
+        self.latencies = []
+
+    def _sink(self, symbol):
+        sink = self.sinks.get(symbol)
+        if sink is None:
+            sink = self.sinks[symbol] = JsonlSink(self.out_dir, f"poll_binance_{symbol}")
+        return sink
+
+    def _get(self, params):
+        response = self.fetcher.get(self.url, params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_prices(self):
+        """Lista de tickers {"symbol", "price"} de todos los símbolos."""
+        if self.batch:
+            symbols = json.dumps(self.symbols, separators=(",", ":"))
+            return self._get({"symbols": symbols})
+        return list(self._pool.map(lambda s: self._get({"symbol": s}), self.symbols))
+
+    def poll_once(self):
+        started = time.monotonic()
+        try:
+            tickers = self.fetch_prices()
+        except Exception as e:
+            self.errors += 1
+            print(f"[WARN] Lectura fallida: {e}")
+            return []
+        self.latencies.append(time.monotonic() - started)
+        ts = datetime.now(timezone.utc).isoformat()
+        records = []
+        for j in tickers:
+            rec = {
+                "ts": ts,
+                "source": "binance",
+                "instrument": j["symbol"],
+                "price_usd": float(j["price"])
+            }
+            self._sink(j["symbol"]).write(rec)
+            records.append(rec)
+        return records
 
-URL = f"https://api.binance.com/api/v3/ticker/price?symbol={SYMBOL}"
-DST = OUT_DIR / f"poll_binance_{SYMBOL}_{datetime.now().strftime('%Y-%m-%d')}.jsonl"
+    def run(self, iterations=ITERATIONS):
+        start = time.monotonic()
+        tick = 0
+        try:
+            while tick < iterations:
+                records = self.poll_once()
+                self.ticks += 1
+                print(f"[POLL] {tick + 1}/{iterations} -> {len(records)} precios")
+                tick += 1
+                if tick >= iterations:
+                    break
+                # Siguiente tick según el reloj fijo; si ya pasó, se saltan los atrasados.
+                now = time.monotonic()
+                due = start + tick * self.interval
+                if now > due:
+                    missed = int((now - due) // self.interval)
+                    self.skipped_ticks += missed
+                    tick += missed
+                    due = start + tick * self.interval
+                time.sleep(max(0.0, due - now))
+        finally:
+            # Las estadísticas del pool se leen antes de cerrar la sesión.
+            stats = self.stats()
+            self.close()
+        return stats
 
-for i in range(ITERATIONS):
-    r = requests.get(URL, timeout=10)
-    r.raise_for_status()
-    j = r.json()
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            "ticks": self.ticks,
+            "skipped_ticks": self.skipped_ticks,
+            "errors": self.errors,
+            "latency_p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+            "latency_max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+            "pool_reuse_rate": round(self.fetcher.pool_reuse_rate(), 3),
+        }
 
-    rec = {
-        "ts": datetime.now(timezone.utc).isoformat(),
-        "source": "binance",
-        "instrument": j["symbol"],
-        "price_usd": float(j["price"])
-    }
+    def close(self):
+        for sink in self.sinks.values():
+            sink.close()
+        if self._pool is not None:
+            self._pool.shutdown()
+        self.fetcher.close()
 
-    with DST.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(rec) + "\n")
+def main():
+    parser = argparse.ArgumentParser(description="Poller de precios de Binance por HTTP")
+    parser.add_argument("--symbols", nargs="+", default=SYMBOLS, help="Símbolos, p. ej. BTCUSDT ETHUSDT")
+    parser.add_argument("--interval", type=float, default=INTERVAL_SEC, help="Segundos entre lecturas")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS, help="Número de lecturas")
+    parser.add_argument("--base-url", default=BASE_URL, help="URL base de la API REST")
+    parser.add_argument("--per-symbol", action="store_true", help="Una petición por símbolo en paralelo en lugar de una por lote")
+    parser.add_argument("--out-dir", default=str(OUT_DIR), help="Directorio de salida")
+    args = parser.parse_args()
 
-    print(f"[POLL] {i+1}/{ITERATIONS} -> {rec}")
-    time.sleep(INTERVAL_SEC)
+    poller = PricePoller(args.symbols, args.interval, args.base_url, args.out_dir, batch=not args.per_symbol)
+    stats = poller.run(args.iterations)
+    print(f"[STATS] {stats}")
+    for sink in poller.sinks.values():
+        print("[DONE] Archivo:", sink.path.resolve())
 
-print("[DONE] Archivo:", DST.resolve())
\ No newline at end of file
+if __name__ == "__main__":
+    main()
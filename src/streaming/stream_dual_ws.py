@@ -1,5 +1,5 @@
 # src/streaming/stream_dual_ws.py  (solo Binance)
-import asyncio, json, os, sys
+import asyncio, os, sys, time
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
@@ -14,35 +14,241 @@ except ImportError:
 ROOT_DIR = Path(__file__).resolve().parents[2]   # streaming/ -> src/ -> root
 OUT_DIR = ROOT_DIR / "data"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
+# Como script hace falta src/ en el path; quien lo importe (benchmarks/) ya lo añade,
+# igual que con poll_coincap_http.py.
+if __name__ == "__main__":
+    sys.path.insert(0, str(ROOT_DIR / "src"))
 
-BINANCE_URL = "wss://stream.binance.com:9443/ws/btcusdt@trade"
+from data.sinks import JsonlSink, ParquetSink  # noqa: E402
+from metrics import REGISTRY, start_exporters  # noqa: E402
+from profiler import install_signal_handler, start_from_env  # noqa: E402
+from streaming.aggregation import TradeAggregator  # noqa: E402
+from streaming.backfill import BINANCE_REST_URL, TradeBackfill  # noqa: E402
+from streaming.codec import get_codec, ms_to_iso, now_iso  # noqa: E402
 
-def out_path_for_today() -> Path:
-    today = datetime.now().strftime("%Y-%m-%d")
-    return OUT_DIR / f"stream_ws_{today}.jsonl"
+# Endpoint del combined stream: <base>/stream?streams=btcusdt@trade/ethusdt@aggTrade/...
+# Se puede apuntar a un servidor local (benchmarks) con BINANCE_WS_BASE
+BINANCE_WS_BASE = os.getenv("BINANCE_WS_BASE", "wss://stream.binance.com:9443")
+MAX_STREAMS_PER_CONNECTION = 1024   # límite de Binance por conexión
 
-async def consume_binance(ws):
-    """
-    Lee un mensaje del stream de trades de Binance y lo normaliza.
-    Esquema del WS (trade): https://developers.binance.com/docs/binance-spot-api-docs/web-socket-streams
-    """
-    msg = await asyncio.wait_for(ws.recv(), timeout=25)
-    d = json.loads(msg)
+# Qué se suscribe (override por variables de entorno)
+SYMBOLS      = [s.strip().lower() for s in os.getenv("WS_SYMBOLS", "btcusdt").split(",") if s.strip()]
+STREAM_TYPES = [s.strip() for s in os.getenv("WS_STREAM_TYPES", "trade").split(",") if s.strip()]
+SHARDS       = int(os.getenv("WS_SHARDS", "1"))
+BACKFILL     = os.getenv("WS_BACKFILL", "1") == "1"   # recuperar huecos de trades vía REST
+BARS         = os.getenv("WS_BARS", "1") == "1"       # barras OHLCV 1s/1m + VWAP móvil en bars_*.jsonl
+
+# Volcado del buffer de escritura: por tamaño, por tiempo y, opcionalmente, con fsync
+FLUSH_BYTES    = int(os.getenv("WS_FLUSH_BYTES", str(64 * 1024)))
+FLUSH_INTERVAL = float(os.getenv("WS_FLUSH_INTERVAL", "1.0"))
+FSYNC          = os.getenv("WS_FSYNC", "0") == "1"
+SINK_FORMAT    = os.getenv("WS_SINK", "jsonl")   # jsonl | parquet (particionado date=/source=)
+
+QUOTE_CURRENCIES = ("USDT", "USDC", "FDUSD", "BUSD", "TUSD", "BTC", "ETH", "BNB", "EUR", "TRY", "BRL")
+
+def quote_currency(symbol):
+    for quote in QUOTE_CURRENCIES:
+        if symbol.endswith(quote):
+            return quote
+    return None
+
+# Decodificación/serialización (orjson > msgspec > json; override con WS_CODEC)
+CODEC = get_codec()
+
+# Camino por mensaje (src/metrics.py): decodificar y enrutar/escribir, sin la espera en la red
+MESSAGE_HELP = "Duración por mensaje del stream"
+DECODE_SECONDS = REGISTRY.histogram("stream_message_seconds", MESSAGE_HELP, stage="decode")
+ROUTE_SECONDS = REGISTRY.histogram("stream_message_seconds", MESSAGE_HELP, stage="route")
+BACKFILL_SECONDS = REGISTRY.histogram("stream_backfill_seconds", "Duración de cada recuperación de huecos por REST")
+RECONNECTS = REGISTRY.counter("stream_reconnects_total", "Reconexiones del WebSocket tras un error")
+
+# Normalizadores por tipo de stream. `ts` es el tiempo del trade según el exchange (T).
+# Esquemas: https://developers.binance.com/docs/binance-spot-api-docs/web-socket-streams
+def normalize_trade(d):
     return {
-        "ts": datetime.now(timezone.utc).isoformat(),
+        "ts": ms_to_iso(d["T"]),
         "source": "binance",
         "instrument": d["s"],               # BTCUSDT
         "price": float(d["p"]),
-        "currency": "USDT",
+        "currency": quote_currency(d["s"]),
         "qty": float(d["q"]),
         "trade_id": d["t"]
     }
 
-async def run_stream(max_events=None, max_seconds=None):
+def normalize_agg_trade(d):
+    return {
+        "ts": ms_to_iso(d["T"]),
+        "source": "binance",
+        "instrument": d["s"],
+        "price": float(d["p"]),
+        "currency": quote_currency(d["s"]),
+        "qty": float(d["q"]),
+        "agg_id": d["a"],
+        "first_trade_id": d["f"],
+        "last_trade_id": d["l"]
+    }
+
+def normalize_book_ticker(d):
+    return {
+        "ts": now_iso(),                    # bookTicker no trae tiempo de evento en spot
+        "source": "binance",
+        "instrument": d["s"],
+        "bid": float(d["b"]),
+        "bid_qty": float(d["B"]),
+        "ask": float(d["a"]),
+        "ask_qty": float(d["A"]),
+        "update_id": d["u"]
+    }
+
+NORMALIZERS = {"trade": normalize_trade, "aggTrade": normalize_agg_trade, "bookTicker": normalize_book_ticker}
+# Campo que da la secuencia de cada tipo de stream
+SEQ_FIELDS = {"trade": "t", "aggTrade": "a", "bookTicker": "u"}
+
+def combined_url(base, streams):
+    return f"{base}/stream?streams={'/'.join(streams)}"
+
+def shard_streams(streams, shards):
+    """Reparte los streams en `shards` conexiones (más si se supera el límite por conexión)."""
+    needed = -(-len(streams) // MAX_STREAMS_PER_CONNECTION)
+    shards = max(1, shards, needed)
+    groups = [streams[i::shards] for i in range(shards)]
+    return [g for g in groups if g]
+
+async def consume_binance(ws):
+    """
+    Lee un mensaje del combined stream ({"stream": "btcusdt@trade", "data": {...}}).
+    Devuelve (símbolo, tipo de stream, datos crudos).
+    """
+    msg = await asyncio.wait_for(ws.recv(), timeout=25)
+    started = time.perf_counter()
+    envelope = CODEC.loads(msg)
+    DECODE_SECONDS.observe(time.perf_counter() - started)
+    symbol, stream_type = envelope["stream"].split("@", 1)
+    return symbol.upper(), stream_type, envelope["data"]
+
+class StreamRouter:
+    """
+    Enruta cada mensaje a un JsonlSink por (símbolo, tipo de stream) y lleva la
+    última secuencia vista de cada uno. Con `backfill`, los huecos de ids en
+    trade/aggTrade se recuperan por REST y se escriben antes del mensaje que los reveló.
+    Con `bars_source` ("trade" o "aggTrade"), los trades de ese stream alimentan un
+    TradeAggregator por instrumento y las barras cerradas van a `bars_<intervalo>_<SÍMBOLO>`.
+    """
+    def __init__(self, out_dir, flush_bytes=FLUSH_BYTES, flush_interval=FLUSH_INTERVAL, fsync=FSYNC,
+                 backfill=None, codec=None, bars_source=None, sink_format=SINK_FORMAT):
+        self.out_dir = out_dir
+        self.sink_format = sink_format
+        self.bars_source = bars_source
+        self.aggregators = {}
+        self.codec = codec or CODEC
+        self.backfill = backfill
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.sinks = {}
+        self.last_seq = {}        # (símbolo, tipo) -> última secuencia vista
+        self.out_of_order = {}    # (símbolo, tipo) -> mensajes repetidos o desordenados
+        self.written = 0
+
+    def sink_for(self, prefix):
+        sink = self.sinks.get(prefix)
+        if sink is None:
+            if self.sink_format == "parquet":
+                sink = ParquetSink(self.out_dir, prefix)
+            else:
+                sink = JsonlSink(self.out_dir, prefix, self.flush_bytes, self.flush_interval, self.fsync)
+            self.sinks[prefix] = sink
+        return sink
+
+    def emit(self, prefix, rec):
+        sink = self.sink_for(prefix)
+        if self.sink_format == "parquet":
+            sink.write(rec)
+        else:
+            sink.write_raw(self.codec.dump_line(rec))
+
+    def write_bars(self, closed):
+        for label, bar in closed:
+            self.emit(f"bars_{label}_{bar['instrument']}", bar)
+
+    def route(self, symbol, stream_type, data, backfilled=False):
+        key = (symbol, stream_type)
+        seq = data[SEQ_FIELDS[stream_type]]
+        last = self.last_seq.get(key)
+        in_order = last is None or seq > last
+        if in_order:
+            self.last_seq[key] = seq
+        else:
+            self.out_of_order[key] = self.out_of_order.get(key, 0) + 1
+        rec = NORMALIZERS[stream_type](data)
+        if backfilled:
+            rec["backfill"] = True
+        self.emit(f"stream_ws_{symbol}_{stream_type}", rec)
+        self.written += 1
+
+        # Los repetidos no se agregan para no contar dos veces el volumen.
+        if stream_type == self.bars_source and in_order:
+            aggregator = self.aggregators.get(symbol)
+            if aggregator is None:
+                aggregator = self.aggregators[symbol] = TradeAggregator(symbol)
+            closed = aggregator.add(data["T"], rec["price"], rec["qty"])
+            if closed:
+                self.write_bars(closed)
+
+    async def handle(self, symbol, stream_type, data):
+        """Como `route`, pero antes rellena el hueco si el id no es el siguiente esperado."""
+        last = self.last_seq.get((symbol, stream_type))
+        seq = data[SEQ_FIELDS[stream_type]]
+        if (self.backfill is not None and last is not None and seq > last + 1
+                and self.backfill.supports(stream_type)):
+            print(f"[WARN] Hueco en {symbol}@{stream_type}: ids {last + 1}..{seq - 1}")
+            try:
+                with BACKFILL_SECONDS.time():
+                    rows = await asyncio.to_thread(self.backfill.fetch_range, symbol, stream_type, last + 1, seq - 1)
+            except Exception as e:
+                print(f"[WARN] Backfill fallido para {symbol}@{stream_type}: {e}")
+                rows = []
+            for row in rows:
+                self.route(symbol, stream_type, row, backfilled=True)
+        started = time.perf_counter()
+        self.route(symbol, stream_type, data)
+        ROUTE_SECONDS.observe(time.perf_counter() - started)
+
+    async def autoflush(self):
+        """Una sola tarea de fondo vuelca todos los sinks con datos pendientes."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            for sink in list(self.sinks.values()):
+                sink.flush_if_due()
+
+    def close(self):
+        # Las barras aún abiertas se escriben como parciales antes de cerrar.
+        for aggregator in self.aggregators.values():
+            self.write_bars(aggregator.flush())
+        for sink in self.sinks.values():
+            sink.close()
+
+async def run_stream(max_events=None, max_seconds=None, symbols=None, stream_types=None,
+                     shards=None, base_url=None, out_dir=None, backfill=None, rest_url=None, bars=None,
+                     sink_format=None):
     """
     Parámetros opcionales (también por variables de entorno):
       - WS_MAX_EVENTS  (int)
       - WS_MAX_SECONDS (int)
+      - WS_SYMBOLS       (lista separada por comas, p. ej. btcusdt,ethusdt)
+      - WS_STREAM_TYPES  (trade, aggTrade, bookTicker)
+      - WS_SHARDS        (número de conexiones entre las que repartir los streams)
+      - WS_BACKFILL      (1/0: recuperar por REST los trades perdidos entre reconexiones)
+      - BINANCE_REST_URL (URL base de la API REST, p. ej. un servidor local)
+      - WS_BARS          (1/0: barras OHLCV 1s/1m y VWAP móvil a partir de trade o aggTrade)
+      - WS_SINK          (jsonl | parquet; Parquet en <out_dir>/<prefijo>/date=.../source=.../)
+      - METRICS_PORT     (sirve métricas Prometheus en http://127.0.0.1:<puerto>/metrics)
+      - METRICS_SNAPSHOT (ruta de un snapshot JSON de métricas, cada METRICS_INTERVAL s)
+      - PROFILE_CPU      (segundos de perfil por muestreo en reports/profiles; 0 = todo el run,
+                          ver src/profiler.py; como script, `kill -USR2 <pid>` perfila en caliente)
+    Todos los streams van por el endpoint combinado de Binance; cada (símbolo, tipo)
+    se escribe en su propio JsonlSink con buffer (ver src/data/sinks.py), que rota
+    el archivo al cambiar de día.
     """
     try:
         if max_events is None and "WS_MAX_EVENTS" in os.environ:
@@ -52,42 +258,85 @@ async def run_stream(max_events=None, max_seconds=None):
     except Exception:
         pass
 
+    symbols = [s.lower() for s in (symbols or SYMBOLS)]
+    stream_types = stream_types or STREAM_TYPES
+    unknown = set(stream_types) - set(NORMALIZERS)
+    if unknown:
+        raise ValueError(f"Tipos de stream no soportados: {sorted(unknown)}")
+    streams = [f"{s}@{t}" for s in symbols for t in stream_types]
+    groups = shard_streams(streams, shards or SHARDS)
+
     deadline = datetime.now() + timedelta(seconds=max_seconds) if max_seconds else None
-    written = 0
-    backoff = 1
+    backfill = BACKFILL if backfill is None else backfill
+    backfiller = TradeBackfill(rest_url or BINANCE_REST_URL) if backfill else None
+    bars = BARS if bars is None else bars
+    bars_source = next((t for t in ("trade", "aggTrade") if t in stream_types), None) if bars else None
+    router = StreamRouter(out_dir or OUT_DIR, backfill=backfiller, bars_source=bars_source,
+                          sink_format=sink_format or SINK_FORMAT)
+    done = asyncio.Event()
+    flusher = asyncio.create_task(router.autoflush())
+    exporters = start_exporters()
+    profiling = start_from_env("stream_dual_ws")
 
     # Línea de prueba para validar permisos/ruta
-    with out_path_for_today().open("a", encoding="utf-8") as f:
-        f.write(json.dumps({"_probe": True, "ts": datetime.now(timezone.utc).isoformat()}) + "\n")
+    probe = JsonlSink(out_dir or OUT_DIR, "stream_ws_probe")
+    probe.write({"_probe": True, "ts": datetime.now(timezone.utc).isoformat(), "streams": len(streams)})
+    probe.close()
 
+    print(f"[INFO] {len(streams)} streams en {len(groups)} conexión(es), codec {router.codec.name}")
+    try:
+        await asyncio.gather(*(
+            _shard_loop(router, combined_url(base_url or BINANCE_WS_BASE, group), max_events, deadline, done)
+            for group in groups
+        ))
+    finally:
+        flusher.cancel()
+        exporters.stop()
+        if profiling is not None:
+            profiling.stop()
+        router.close()
+        if backfiller is not None:
+            backfiller.close()
+
+    if deadline is not None and datetime.now() >= deadline:
+        print(f"[DONE] Tiempo agotado. Eventos: {router.written}")
+    else:
+        print(f"[DONE] Eventos: {router.written}")
+    for (symbol, stream_type), count in router.out_of_order.items():
+        print(f"[WARN] {symbol}@{stream_type}: {count} mensajes fuera de orden")
+    if backfiller is not None and backfiller.gaps:
+        print(f"[STATS] Backfill: {backfiller.stats()}")
+    for sink in router.sinks.values():
+        print(sink.path.resolve())
+    return router
+
+async def _shard_loop(router, url, max_events, deadline, done):
+    backoff = 1
     while True:
-        # Criterios de parada
-        if max_events is not None and written >= max_events:
-            print(f"[DONE] Eventos: {written}")
-            print(out_path_for_today().resolve())
-            return
+        # Criterios de parada (compartidos por todas las conexiones)
+        if max_events is not None and router.written >= max_events:
+            done.set()
         if deadline is not None and datetime.now() >= deadline:
-            print(f"[DONE] Tiempo agotado. Eventos: {written}")
-            print(out_path_for_today().resolve())
+            done.set()
+        if done.is_set():
             return
 
         try:
-            async with websockets.connect(BINANCE_URL, ping_interval=20, ping_timeout=20) as ws:
+            async with websockets.connect(url, ping_interval=20, ping_timeout=20) as ws:
                 backoff = 1
-                while True:
+                while not done.is_set():
                     if deadline is not None and datetime.now() >= deadline:
                         break
-                    rec = await consume_binance(ws)
-                    with out_path_for_today().open("a", encoding="utf-8") as f:
-                        f.write(json.dumps(rec, ensure_ascii=False) + "\n")
-                    written += 1
-                    if max_events is not None and written >= max_events:
+                    symbol, stream_type, data = await consume_binance(ws)
+                    await router.handle(symbol, stream_type, data)
+                    if max_events is not None and router.written >= max_events:
                         break
 
         except asyncio.TimeoutError:
             # Reinicia el bucle para evitar bloqueos largos si no llegan mensajes
             continue
-        except (InvalidStatusCode, ConnectionClosed, OSError) as e:
+        except (InvalidStatusCode, ConnectionClosed, OSError):
+            RECONNECTS.inc()
             # Desconexión o rechazo: espera exponencial y reintenta
             await asyncio.sleep(backoff)
             backoff = min(backoff * 2, 30)
@@ -95,11 +344,13 @@ async def run_stream(max_events=None, max_seconds=None):
             print("\n[STOP] Cancelado por el usuario.")
             sys.exit(0)
         except Exception:
+            RECONNECTS.inc()
             await asyncio.sleep(backoff)
             backoff = min(backoff * 2, 30)
 
 if __name__ == "__main__":
+    install_signal_handler("stream_dual_ws")
     try:
         asyncio.run(run_stream())
     except KeyboardInterrupt:
-        print("\n[STOP] Cancelado por el usuario.")
\ No newline at end of file
+        print("\n[STOP] Cancelado por el usuario.")